@@ -0,0 +1,91 @@
+from django.contrib.auth.management import create_permissions
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from .models import TeaCategory, Origin, Tea, Order, OrderItem
+
+USER_GROUP_NAME = "TeaStoreUser"
+USER_GROUP_ID_KEY = "teastore:user-group:id"
+USER_GROUP_PERMISSIONS = [
+    (TeaCategory, ["view"]),
+    (Origin, ["view"]),
+    (Tea, ["view"]),
+    (Order, ["add", "view"]),
+    (OrderItem, ["add", "view"]),
+]
+
+
+def ensure_user_group():
+    group, _ = Group.objects.get_or_create(name=USER_GROUP_NAME)
+    codenames = [
+        f"{perm}_{model._meta.model_name}"
+        for model, perms in USER_GROUP_PERMISSIONS
+        for perm in perms
+    ]
+    permissions = Permission.objects.filter(
+        content_type__app_label=Tea._meta.app_label, codename__in=codenames
+    )
+    group.permissions.add(*permissions)
+    cache.set(USER_GROUP_ID_KEY, group.pk, None)
+    return group
+
+
+def provision_user_group(sender, app_config=None, using="default", **kwargs):
+    # Uprawnienia aplikacji tworzy dopiero post_migrate z django.contrib.auth,
+    # ktory moze sie wykonac po nas - create_permissions jest idempotentne.
+    create_permissions(app_config or sender, verbosity=0, using=using)
+    ensure_user_group()
+
+
+def user_group_id():
+    group_id = cache.get(USER_GROUP_ID_KEY)
+    if group_id is None:
+        group_id = (
+            Group.objects.filter(name=USER_GROUP_NAME).values_list("pk", flat=True).first()
+        )
+        if group_id is None:
+            return ensure_user_group().pk
+        cache.set(USER_GROUP_ID_KEY, group_id, None)
+    return group_id
+
+
+def forget_user_group():
+    cache.delete(USER_GROUP_ID_KEY)
+
+
+def register_user_account(user):
+    User.groups.through.objects.create(user_id=user.pk, group_id=user_group_id())
+    return Token.objects.create(user=user)
+
+
+# Niezapisany uzytkownik z haslem jak w create_user. PBKDF2 liczymy przed transakcja -
+# nie trzymamy blokady zapisu SQLite na czas haszowania
+def build_user(row):
+    row = dict(row)
+    password = row.pop("password", None)
+    user = User(**row)
+    user.username = User.normalize_username(user.username)
+    user.email = User.objects.normalize_email(user.email)
+    if password:
+        user.set_password(password)
+    else:
+        user.set_unusable_password()
+    return user
+
+
+def register_user_accounts_bulk(rows, batch_size=500):
+    users = [build_user(row) for row in rows]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        group_id = user_group_id()
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=user.pk, group_id=group_id) for user in users],
+            batch_size=batch_size,
+        )
+        tokens = Token.objects.bulk_create(
+            [Token(user=user, key=Token.generate_key()) for user in users],
+            batch_size=batch_size,
+        )
+    return tokens
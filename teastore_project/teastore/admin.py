@@ -1,6 +1,17 @@
+from django import forms
 from django.contrib import admin
+from django.db import transaction
 
-from .models import TeaCategory, Origin, Tea, Order, OrderItem
+from .models import TeaCategory, Origin, Tea, Order, OrderItem, OrderStatus
+from .stock import (
+    RESERVING_STATUSES,
+    apply_status_change,
+    holds_stock,
+    order_lines,
+    release_stock,
+    reserve_stock,
+    stock_shortfalls,
+)
 
 
 @admin.register(TeaCategory)
@@ -23,14 +34,111 @@ class TeaAdmin(admin.ModelAdmin):
     search_fields = ["name"]
 
 
+def _check_stock(lines):
+    shortfalls = stock_shortfalls(lines)
+    if shortfalls:
+        missing = ", ".join(
+            f"herbata {row['tea']}: dostepne {row['available']}" for row in shortfalls
+        )
+        raise forms.ValidationError(f"Niewystarczajacy stan magazynowy ({missing}).")
+
+
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        restored = (
+            self.instance.pk
+            and self.initial.get("status") == OrderStatus.CANCELED
+            and cleaned_data.get("status") not in (None, OrderStatus.CANCELED)
+        )
+        if restored:
+            _check_stock(order_lines(self.instance))
+        return cleaned_data
+
+
+class OrderItemAdminForm(forms.ModelForm):
+    class Meta:
+        model = OrderItem
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        order, tea = cleaned_data.get("order"), cleaned_data.get("tea")
+        quantity = cleaned_data.get("quantity")
+        if order is None or tea is None or quantity is None or not holds_stock(order):
+            return cleaned_data
+        if self.instance.pk:
+            # Dotychczasowa rezerwacja tej samej herbaty zostanie zwolniona przed nowa
+            previous = OrderItem.objects.select_related("order").get(pk=self.instance.pk)
+            if previous.tea_id == tea.pk and holds_stock(previous.order):
+                quantity -= previous.quantity
+        _check_stock([(tea.pk, quantity)])
+        return cleaned_data
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ["id", "user", "status", "created_at", "delivery_date"]
+    form = OrderAdminForm
+    list_display = [
+        "id", "user", "status", "created_at", "delivery_date", "item_count", "total_amount"
+    ]
     list_filter = ["status", "created_at"]
     search_fields = ["user__username"]
 
+    def save_model(self, request, obj, form, change):
+        # Zmiana statusu z panelu rezerwuje i zwalnia stan tak samo jak API
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if change and "status" in form.changed_data:
+                apply_status_change(obj, form.initial["status"])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            if holds_stock(obj):
+                release_stock(order_lines(obj))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            release_stock(
+                OrderItem.objects.filter(
+                    order__in=queryset, order__status__in=RESERVING_STATUSES
+                ).values_list("tea_id", "quantity")
+            )
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
+    form = OrderItemAdminForm
     list_display = ["order", "tea", "quantity", "unit_price"]
     list_filter = ["tea"]
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                previous = OrderItem.objects.select_related("order").get(pk=obj.pk)
+                if holds_stock(previous.order):
+                    release_stock([(previous.tea_id, previous.quantity)])
+            if holds_stock(obj.order):
+                reserve_stock([(obj.tea_id, obj.quantity)])
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            if holds_stock(obj.order):
+                release_stock([(obj.tea_id, obj.quantity)])
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            release_stock(
+                queryset.filter(order__status__in=RESERVING_STATUSES).values_list(
+                    "tea_id", "quantity"
+                )
+            )
+            super().delete_queryset(request, queryset)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TeastoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'teastore'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .accounts import provision_user_group
+
+        post_migrate.connect(provision_user_group, sender=self)
@@ -0,0 +1,129 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .authentication import acached_token, aremember_token
+from .cache import acatalog_response
+from .filters import filter_teas
+from .models import TeaCategory, Origin, Tea, Order
+from .permissions import auser_has_perm
+from .search import TeaSearchResults, search_available
+from .serializers import TeaCategorySerializer, OriginSerializer, TeaSerializer, OrderSerializer
+
+# Widoki async bez DRF (DRF nie obsluguje widokow async) - uwierzytelnianie tokenem lub sesja
+# i uprawnienia sprawdzane tak samo jak w teastore/views.py, ale przez async ORM.
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        JSONRenderer().render(data), content_type="application/json", status=status_code
+    )
+
+
+async def _authenticate(request):
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    if keyword == "Token":
+        key = key.strip()
+        token = await acached_token(key)
+        if token is None:
+            try:
+                token = await Token.objects.select_related("user").aget(key=key)
+            except Token.DoesNotExist:
+                return None
+            if not token.user.is_active:
+                return None
+            await aremember_token(token)
+        return token.user
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def async_read_view(model):
+    perm = f"{model._meta.app_label}.view_{model._meta.model_name}"
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return _json(
+                    {"detail": "Metoda niedozwolona."}, status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+            user = await _authenticate(request)
+            if user is None:
+                return _json(
+                    {"detail": "Brak danych uwierzytelniajacych."}, status.HTTP_401_UNAUTHORIZED
+                )
+            if not await auser_has_perm(user, perm):
+                return _json(
+                    {"detail": "Brak uprawnien do tej operacji."}, status.HTTP_403_FORBIDDEN
+                )
+            request.user = user
+            try:
+                return await view(request, *args, **kwargs)
+            except Http404:
+                return _json({"detail": "Nie znaleziono."}, status.HTTP_404_NOT_FOUND)
+            except ValidationError as exc:
+                return _json(exc.detail, status.HTTP_400_BAD_REQUEST)
+
+        return wrapper
+
+    return decorator
+
+
+async def _detail(model, serializer_class, pk):
+    try:
+        instance = await model.objects.aget(pk=pk)
+    except model.DoesNotExist:
+        raise Http404
+    return serializer_class(instance).data
+
+
+@async_read_view(Tea)
+async def tea_list_async(request):
+    async def build():
+        teas = filter_teas(Tea.objects.all(), request.GET)
+        return TeaSerializer([tea async for tea in teas], many=True).data
+
+    return await acatalog_response(request, build)
+
+
+@async_read_view(Tea)
+async def tea_detail_async(request, pk):
+    return await acatalog_response(request, lambda: _detail(Tea, TeaSerializer, pk))
+
+
+@async_read_view(TeaCategory)
+async def category_detail_async(request, pk):
+    return await acatalog_response(
+        request, lambda: _detail(TeaCategory, TeaCategorySerializer, pk)
+    )
+
+
+@async_read_view(Origin)
+async def origin_detail_async(request, pk):
+    return await acatalog_response(request, lambda: _detail(Origin, OriginSerializer, pk))
+
+
+@async_read_view(Tea)
+async def teas_search_async(request):
+    name = request.GET.get("name")
+    if not name:
+        return _json({"error": "Parametr 'name' jest wymagany."}, status.HTTP_400_BAD_REQUEST)
+
+    if await sync_to_async(search_available)():
+        # Zapytanie FTS5 idzie surowym kursorem, wiec uruchamiamy je w watku ORM
+        teas = await sync_to_async(list)(TeaSearchResults(name))
+    else:
+        teas = [tea async for tea in Tea.objects.filter(name__icontains=name).order_by("id")]
+    return _json(TeaSerializer(teas, many=True).data)
+
+
+@async_read_view(Order)
+async def orders_my_async(request):
+    orders = Order.objects.filter(user=request.user).prefetch_related("items")
+    return _json(OrderSerializer([order async for order in orders], many=True).data)
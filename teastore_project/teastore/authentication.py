@@ -0,0 +1,128 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_SIZE = getattr(settings, "TEASTORE_TOKEN_CACHE_SIZE", 1024)
+TOKEN_CACHE_TIMEOUT = getattr(settings, "TEASTORE_TOKEN_CACHE_TIMEOUT", 60)
+TOKEN_SHARED_CACHE = getattr(settings, "TEASTORE_TOKEN_SHARED_CACHE", False)
+
+# Tokeny w pamieci procesu: klucz -> (wygasa, generacja uzytkownika, token z uzytkownikiem)
+_tokens = OrderedDict()
+_lock = threading.Lock()
+
+
+def _generation_key(user_id):
+    return f"teastore:tokens:user:{user_id}"
+
+
+def _shared_key(key):
+    return f"teastore:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def _user_generation(user_id):
+    # Generacja uzytkownika lezy we wspolnym cache, wiec usuniecie tokenu lub dezaktywacja
+    # konta w jednym procesie uniewaznia wpisy w pamieci pozostalych
+    generation = cache.get(_generation_key(user_id))
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(_generation_key(user_id), generation, None)
+        generation = cache.get(_generation_key(user_id), generation)
+    return generation
+
+
+async def _auser_generation(user_id):
+    generation = await cache.aget(_generation_key(user_id))
+    if generation is None:
+        generation = time.time_ns()
+        await cache.aadd(_generation_key(user_id), generation, None)
+        generation = await cache.aget(_generation_key(user_id), generation)
+    return generation
+
+
+def invalidate_user_tokens(user_ids):
+    now = time.time_ns()
+    cache.set_many({_generation_key(user_id): now for user_id in user_ids}, None)
+
+
+def clear_token_cache():
+    with _lock:
+        _tokens.clear()
+
+
+def _local_entry(key, now):
+    with _lock:
+        entry = _tokens.get(key)
+        if entry is not None:
+            _tokens.move_to_end(key)
+    return None if entry is None or entry[0] < now else entry
+
+
+def _use_entry(key, entry):
+    _store(key, entry)
+    # Kopia, zeby zmiany na request.user (np. cache uprawnien) nie trafialy do wpisu
+    token = copy.copy(entry[2])
+    token.user = copy.copy(token.user)
+    return token
+
+
+def cached_token(key):
+    now = time.monotonic()
+    entry = _local_entry(key, now)
+    if entry is None and TOKEN_SHARED_CACHE:
+        shared = cache.get(_shared_key(key))
+        if shared is not None:
+            entry = (now + TOKEN_CACHE_TIMEOUT,) + shared
+    if entry is None or entry[1] != _user_generation(entry[2].user_id):
+        return None
+    return _use_entry(key, entry)
+
+
+async def acached_token(key):
+    # Jak cached_token, ale bez blokujacych odczytow wspolnego cache w petli zdarzen
+    now = time.monotonic()
+    entry = _local_entry(key, now)
+    if entry is None and TOKEN_SHARED_CACHE:
+        shared = await cache.aget(_shared_key(key))
+        if shared is not None:
+            entry = (now + TOKEN_CACHE_TIMEOUT,) + shared
+    if entry is None or entry[1] != await _auser_generation(entry[2].user_id):
+        return None
+    return _use_entry(key, entry)
+
+
+def remember_token(token):
+    entry = (time.monotonic() + TOKEN_CACHE_TIMEOUT, _user_generation(token.user_id), token)
+    _store(token.key, entry)
+    if TOKEN_SHARED_CACHE:
+        cache.set(_shared_key(token.key), entry[1:], TOKEN_CACHE_TIMEOUT)
+
+
+async def aremember_token(token):
+    generation = await _auser_generation(token.user_id)
+    entry = (time.monotonic() + TOKEN_CACHE_TIMEOUT, generation, token)
+    _store(token.key, entry)
+    if TOKEN_SHARED_CACHE:
+        await cache.aset(_shared_key(token.key), entry[1:], TOKEN_CACHE_TIMEOUT)
+
+
+def _store(key, entry):
+    with _lock:
+        _tokens[key] = entry
+        _tokens.move_to_end(key)
+        while len(_tokens) > TOKEN_CACHE_SIZE:
+            _tokens.popitem(last=False)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = cached_token(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            remember_token(token)
+        return token.user, token
@@ -0,0 +1,265 @@
+import http.client
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+
+from django.db import connection
+
+DEFAULT_BENCHMARK_DB = Path(tempfile.gettempdir()) / "teastore_benchmark.sqlite3"
+BENCHMARK_PASSWORD = "bench-password"
+
+
+@contextmanager
+def benchmark_database(name=None, keepdb=False):
+    # Benchmarki nie dotykaja bazy roboczej - pracuja na osobnym pliku,
+    # zeby watki widzialy te same dane (baza w pamieci tego nie zapewnia).
+    connection.settings_dict.setdefault("TEST", {})["NAME"] = str(name or DEFAULT_BENCHMARK_DB)
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+@contextmanager
+def timer():
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies):
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def run_http_load(host, port, paths, headers, concurrency, requests):
+    # Generator obciazenia po HTTP z trwalymi polaczeniami. Nie uzywa Django, wiec moze
+    # dzialac w osobnym procesie i nie konkurowac z serwerem o GIL.
+    per_worker = max(1, requests // concurrency)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        own_latencies = []
+        own_statuses = {}
+        try:
+            for i in range(per_worker):
+                path = paths[(offset + i * concurrency) % len(paths)]
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    code = response.status
+                    if response.will_close:
+                        conn.close()
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    code = "error"
+                own_latencies.append(time.perf_counter() - start)
+                own_statuses[code] = own_statuses.get(code, 0) + 1
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(own_latencies)
+            for code, count in own_statuses.items():
+                statuses[str(code)] = statuses.get(str(code), 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+TEA_WORDS = [
+    "Assam", "Darjeeling", "Sencha", "Gyokuro", "Matcha", "Oolong", "Pu-erh", "Rooibos",
+    "Earl", "Grey", "Jasmine", "Mint", "Chai", "Ceylon", "Keemun", "Lapsang", "Silver",
+    "Needle", "Bancha", "Genmaicha", "Tieguanyin", "Hojicha", "Yunnan", "Nilgiri",
+]
+
+
+def seed_dataset(
+    categories=20,
+    origins=50,
+    teas=100_000,
+    orders=1_000_000,
+    items_per_order=1,
+    users=1_000,
+    staff=5,
+    seed=0,
+    batch_size=5_000,
+    log=None,
+):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Permission, User
+    from django.db import transaction
+
+    from .accounts import user_group_id
+    from .models import (
+        CaffeineLevel,
+        Order,
+        OrderItem,
+        OrderStatus,
+        Origin,
+        Tea,
+        TeaCategory,
+        TeaType,
+    )
+
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    # Jeden hash dla wszystkich kont - PBKDF2 dla kazdego uzytkownika trwalby godzinami
+    password = make_password(BENCHMARK_PASSWORD)
+
+    def batches(objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with transaction.atomic():
+        log(f"uzytkownicy: {users} + {staff} staff")
+        User.objects.bulk_create(
+            [
+                User(username=f"bench-user-{i}", password=password, email=f"user{i}@bench.test")
+                for i in range(users)
+            ]
+            + [
+                User(username=f"bench-staff-{i}", password=password, is_staff=True)
+                for i in range(staff)
+            ],
+            batch_size=batch_size,
+        )
+        user_ids = list(
+            User.objects.filter(username__startswith="bench-user-").values_list("pk", flat=True)
+        )
+        # Obsluga dostaje uprawnienia do modeli sklepu - inaczej zapisy katalogu koncza sie 403
+        staff_permissions = list(
+            Permission.objects.filter(content_type__app_label="teastore").values_list(
+                "pk", flat=True
+            )
+        )
+        User.user_permissions.through.objects.bulk_create(
+            [
+                User.user_permissions.through(user_id=user_id, permission_id=permission_id)
+                for user_id in User.objects.filter(is_staff=True).values_list("pk", flat=True)
+                for permission_id in staff_permissions
+            ]
+        )
+        group_id = user_group_id()
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=user_id, group_id=group_id) for user_id in user_ids],
+            batch_size=batch_size,
+        )
+
+        log(f"kategorie: {categories}, pochodzenia: {origins}")
+        TeaCategory.objects.bulk_create(
+            [TeaCategory(name=f"Kategoria {i}") for i in range(categories)]
+        )
+        Origin.objects.bulk_create(
+            [
+                Origin(
+                    country_code=rng.choice(["CN", "IN", "JP", "LK", "KE", "TW", "NP"]),
+                    region=f"Region {i}",
+                    farm_name=f"Plantacja {i}" if i % 2 else "",
+                    is_organic=bool(i % 3 == 0),
+                )
+                for i in range(origins)
+            ]
+        )
+    category_ids = list(TeaCategory.objects.values_list("pk", flat=True))
+    origin_ids = list(Origin.objects.values_list("pk", flat=True)) + [None]
+
+    log(f"herbaty: {teas}")
+    tea_types = TeaType.values
+    caffeine_levels = CaffeineLevel.values
+    for batch in batches(
+        Tea(
+            name=f"{rng.choice(TEA_WORDS)} {rng.choice(TEA_WORDS)} {i}",
+            description=" ".join(rng.choices(TEA_WORDS, k=12)),
+            category_id=rng.choice(category_ids),
+            origin_id=rng.choice(origin_ids),
+            tea_type=rng.choice(tea_types),
+            caffeine_level=rng.choice(caffeine_levels),
+            price=Decimal(rng.randint(100, 20_000)) / 100,
+            stock_qty=1_000_000,
+            is_active=rng.random() > 0.1,
+        )
+        for i in range(teas)
+    ):
+        with transaction.atomic():
+            Tea.objects.bulk_create(batch)
+    tea_prices = dict(Tea.objects.values_list("pk", "price"))
+    tea_ids = list(tea_prices)
+
+    log(f"zamowienia: {orders} x {items_per_order} pozycji")
+    statuses = OrderStatus.values
+    lines_per_order = min(items_per_order, len(tea_ids))
+    created = 0
+    while created < orders:
+        count = min(batch_size, orders - created)
+        order_lines = [rng.sample(tea_ids, lines_per_order) for _ in range(count)]
+        quantities = [[rng.randint(1, 5) for _ in lines] for lines in order_lines]
+        with transaction.atomic():
+            batch = Order.objects.bulk_create(
+                [
+                    Order(
+                        user_id=rng.choice(user_ids),
+                        status=rng.choice(statuses),
+                        total_amount=sum(
+                            tea_prices[tea_id] * quantity
+                            for tea_id, quantity in zip(lines, line_quantities)
+                        ),
+                        item_count=len(lines),
+                    )
+                    for lines, line_quantities in zip(order_lines, quantities)
+                ]
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order_id=order.pk,
+                        tea_id=tea_id,
+                        quantity=quantity,
+                        unit_price=tea_prices[tea_id],
+                    )
+                    for order, lines, line_quantities in zip(batch, order_lines, quantities)
+                    for tea_id, quantity in zip(lines, line_quantities)
+                ],
+                batch_size=batch_size,
+            )
+        created += count
+        log(f"  {created}/{orders}")
@@ -0,0 +1,119 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .routers import primary_reads
+
+CATALOG_VERSION_KEY = "teastore:catalog:version"
+CATALOG_CACHE_TIMEOUT = getattr(settings, "TEASTORE_CATALOG_CACHE_TIMEOUT", 3600)
+
+
+def _now_us():
+    return time.time_ns() // 1000
+
+
+def catalog_version():
+    # Wersja to znacznik czasu ostatniej zmiany katalogu (w mikrosekundach),
+    # wiec sluzy tez jako Last-Modified.
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = _now_us()
+        cache.add(CATALOG_VERSION_KEY, version, None)
+        version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+async def acatalog_version():
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        version = _now_us()
+        await cache.aadd(CATALOG_VERSION_KEY, version, None)
+        version = await cache.aget(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    current = cache.get(CATALOG_VERSION_KEY) or 0
+    cache.set(CATALOG_VERSION_KEY, max(_now_us(), current + 1), None)
+
+
+def _fragment_key(model, pk):
+    return f"teastore:fragment:{model._meta.model_name}:{pk}:version"
+
+
+def fragment_versions(model, pks):
+    # Wersje fragmentow szablonu (np. karta herbaty) dla wielu obiektow jednym odczytem cache
+    keys = {_fragment_key(model, pk): pk for pk in pks}
+    versions = cache.get_many(keys)
+    missing = {key: _now_us() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {pk: versions[key] for key, pk in keys.items()}
+
+
+def bump_fragment_versions(model, pks):
+    now = _now_us()
+    cache.set_many({_fragment_key(model, pk): now for pk in pks}, None)
+
+
+def _catalog_entry(request, version):
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    etag = f'W/"{version}-{digest[:16]}"'
+    return etag, version // 1_000_000, f"teastore:catalog:{version}:{digest}"
+
+
+def _not_modified(request, etag, last_modified):
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+    return not_modified
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def catalog_response(request, build):
+    etag, last_modified, key = _catalog_entry(request, catalog_version())
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    data = cache.get(key)
+    if data is None:
+        with primary_reads():
+            response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        data = response.data
+        cache.set(key, data, CATALOG_CACHE_TIMEOUT)
+
+    return _set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+
+async def acatalog_response(request, build):
+    # Wersja dla widokow async: build to korutyna zwracajaca dane (bledy zglasza wyjatkami)
+    etag, last_modified, key = _catalog_entry(request, await acatalog_version())
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    content = await cache.aget(key)
+    if content is None:
+        with primary_reads():
+            content = JSONRenderer().render(await build())
+        await cache.aset(key, content, CATALOG_CACHE_TIMEOUT)
+
+    response = HttpResponse(content, content_type="application/json")
+    return _set_validators(response, etag, last_modified)
@@ -0,0 +1,209 @@
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from .cache import bump_catalog_version, bump_fragment_versions
+from .models import TeaCategory, Origin, Tea, TeaType, CaffeineLevel
+from .serializers import validate_country_code, validate_tea_name, validate_tea_values
+
+IMPORT_BATCH_SIZE = getattr(settings, "TEASTORE_IMPORT_BATCH_SIZE", 1000)
+MAX_REPORTED_ERRORS = 100
+FILE_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+TEA_FIELDS = [
+    "description",
+    "category",
+    "origin",
+    "tea_type",
+    "caffeine_level",
+    "price",
+    "stock_qty",
+    "is_active",
+]
+
+# Pola DRF tworzone raz - parsuja wartosci bez serializera na kazdy wiersz
+_PRICE = serializers.DecimalField(max_digits=8, decimal_places=2)
+_STOCK = serializers.IntegerField()
+_BOOLEAN = serializers.BooleanField()
+_TEA_TYPE = serializers.ChoiceField(choices=TeaType.choices)
+_CAFFEINE = serializers.ChoiceField(choices=CaffeineLevel.choices)
+
+
+def detect_format(filename):
+    return FILE_FORMATS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def read_records(stream, file_format):
+    if file_format == "csv":
+        # Numer linii 1 to naglowek
+        for line, row in enumerate(csv.DictReader(stream), start=2):
+            yield line, row
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        yield line, row
+
+
+def _text(row, key, max_length=None, required=False):
+    value = row.get(key)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise serializers.ValidationError({key: "To pole jest wymagane."})
+    if max_length and len(value) > max_length:
+        raise serializers.ValidationError({key: f"Maksymalnie {max_length} znakow."})
+    return value
+
+
+def _parse(field, row, key, default=None):
+    value = row.get(key)
+    if value is None or value == "":
+        if default is None:
+            raise serializers.ValidationError({key: "To pole jest wymagane."})
+        return default
+    try:
+        return field.run_validation(value)
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({key: exc.detail})
+
+
+def clean_record(row):
+    if not isinstance(row, dict):
+        raise serializers.ValidationError({"non_field_errors": "Niepoprawny rekord JSON."})
+
+    try:
+        name = validate_tea_name(_text(row, "name", max_length=120))
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({"name": exc.detail})
+    values = {
+        "description": _text(row, "description"),
+        "tea_type": _parse(_TEA_TYPE, row, "tea_type"),
+        "caffeine_level": _parse(_CAFFEINE, row, "caffeine_level"),
+        "price": _parse(_PRICE, row, "price"),
+        "stock_qty": _parse(_STOCK, row, "stock_qty", default=0),
+        "is_active": _parse(_BOOLEAN, row, "is_active", default=True),
+    }
+    validate_tea_values(values)
+    category = _text(row, "category", max_length=60, required=True)
+
+    origin = None
+    country_code = _text(row, "origin_country_code")
+    if country_code:
+        try:
+            validate_country_code(country_code)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"origin_country_code": exc.detail})
+        origin = (
+            country_code,
+            _text(row, "origin_region", max_length=60, required=True),
+            _text(row, "origin_farm_name", max_length=80),
+        )
+        is_organic = _parse(_BOOLEAN, row, "origin_is_organic", default=False)
+    else:
+        is_organic = False
+    return name, values, category, origin, is_organic
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+        # Klucze naturalne -> pk, wczytane raz dla calego importu
+        self.categories = dict(TeaCategory.objects.values_list("name", "pk"))
+        self.origins = {
+            (country_code, region, farm_name): pk
+            for pk, country_code, region, farm_name in Origin.objects.values_list(
+                "pk", "country_code", "region", "farm_name"
+            )
+        }
+        self.teas = {}
+        for name, pk in Tea.objects.order_by("pk").values_list("name", "pk").iterator():
+            # Nazwa nie jest unikalna - przy duplikatach aktualizujemy najstarsza herbate
+            self.teas.setdefault(name, pk)
+        self.report = {
+            "created": 0,
+            "updated": 0,
+            "categories_created": 0,
+            "origins_created": 0,
+            "invalid": 0,
+            "errors": [],
+        }
+
+    def run(self, records):
+        batch = {}
+        for line, row in records:
+            try:
+                name, values, category, origin, is_organic = clean_record(row)
+            except serializers.ValidationError as exc:
+                self._error(line, serializers.as_serializer_error(exc))
+                continue
+            # W obrebie paczki wygrywa ostatni wiersz o danej nazwie
+            batch[name] = (values, category, origin, is_organic)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = {}
+        if batch:
+            self._flush(batch)
+        return self.report
+
+    def _error(self, line, detail):
+        self.report["invalid"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": line, "errors": detail})
+
+    @transaction.atomic
+    def _flush(self, batch):
+        self._create_categories({category for _, category, _, _ in batch.values()})
+        self._create_origins(
+            {origin: is_organic for _, _, origin, is_organic in batch.values() if origin}
+        )
+
+        created, updated = [], []
+        for name, (values, category, origin, _) in batch.items():
+            values = dict(
+                values,
+                category_id=self.categories[category],
+                origin_id=self.origins[origin] if origin else None,
+            )
+            pk = self.teas.get(name)
+            if pk is None:
+                created.append(Tea(name=name, **values))
+            else:
+                updated.append(Tea(pk=pk, name=name, **values))
+
+        Tea.objects.bulk_create(created, batch_size=self.batch_size)
+        for tea in created:
+            self.teas[tea.name] = tea.pk
+        Tea.objects.bulk_update(updated, TEA_FIELDS, batch_size=self.batch_size)
+        self.report["created"] += len(created)
+        self.report["updated"] += len(updated)
+        # bulk_create/bulk_update pomijaja sygnaly, wiec wersje katalogu i kart podbijamy sami
+        transaction.on_commit(bump_catalog_version)
+        updated_ids = [tea.pk for tea in updated]
+        transaction.on_commit(lambda: bump_fragment_versions(Tea, updated_ids))
+
+    def _create_categories(self, names):
+        missing = [TeaCategory(name=name) for name in names if name not in self.categories]
+        for category in TeaCategory.objects.bulk_create(missing):
+            self.categories[category.name] = category.pk
+        self.report["categories_created"] += len(missing)
+
+    def _create_origins(self, origins):
+        missing = [
+            Origin(country_code=key[0], region=key[1], farm_name=key[2], is_organic=is_organic)
+            for key, is_organic in origins.items()
+            if key not in self.origins
+        ]
+        for origin in Origin.objects.bulk_create(missing):
+            self.origins[(origin.country_code, origin.region, origin.farm_name)] = origin.pk
+        self.report["origins_created"] += len(missing)
+
+
+def import_catalog(stream, file_format, batch_size=None):
+    return CatalogImporter(batch_size).run(read_records(stream, file_format))
@@ -0,0 +1,38 @@
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Tea, Order, OrderItem
+from .stock import reserve_stock
+
+
+def place_order(user, lines, delivery_date=None, note=""):
+    tea_ids = [line["tea"] for line in lines]
+    teas = Tea.objects.only("id", "price", "is_active").in_bulk(tea_ids)
+    unavailable = [tea_id for tea_id in tea_ids if tea_id not in teas or not teas[tea_id].is_active]
+    if unavailable:
+        raise ValidationError(
+            {"items": [f"Herbata o id {tea_id} nie jest dostepna." for tea_id in unavailable]}
+        )
+
+    with transaction.atomic():
+        reserve_stock([(line["tea"], line["quantity"]) for line in lines])
+        items = [
+            OrderItem(
+                tea_id=line["tea"],
+                quantity=line["quantity"],
+                unit_price=teas[line["tea"]].price,
+            )
+            for line in lines
+        ]
+        # bulk_create pomija sygnaly, wiec sumy zamowienia ustawiamy od razu
+        order = Order.objects.create(
+            user=user,
+            delivery_date=delivery_date,
+            note=note,
+            total_amount=sum(item.unit_price * item.quantity for item in items),
+            item_count=len(items),
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+    return order
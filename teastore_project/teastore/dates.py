@@ -0,0 +1,8 @@
+import datetime
+
+from django.utils import timezone
+
+
+def day_start(value):
+    # Poczatek dnia w strefie projektu - zakresy po created_at bez __date korzystaja z indeksu
+    return timezone.make_aware(datetime.datetime.combine(value, datetime.time.min))
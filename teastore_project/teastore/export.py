@@ -0,0 +1,128 @@
+import csv
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .dates import day_start
+from .models import Order, OrderStatus
+from .streaming import streaming_body
+
+EXPORT_CHUNK_SIZE = getattr(settings, "TEASTORE_EXPORT_CHUNK_SIZE", 2000)
+CENT = Decimal("0.01")
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+EXPORT_COLUMNS = [
+    ("order_id", "pk"),
+    ("status", "status"),
+    ("created_at", "created_at"),
+    ("delivery_date", "delivery_date"),
+    ("user_id", "user_id"),
+    ("username", "user__username"),
+    ("item_id", "items__id"),
+    ("tea_id", "items__tea_id"),
+    ("tea_name", "items__tea__name"),
+    ("quantity", "items__quantity"),
+    ("unit_price", "items__unit_price"),
+    ("line_total", "line_total"),
+]
+
+
+def export_filters(params):
+    filters = {}
+    for name in ("created_from", "created_to"):
+        raw = params.get(name)
+        if not raw:
+            continue
+        try:
+            value = parse_date(raw) if len(raw) == 10 else None
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({name: ["Data musi miec format RRRR-MM-DD."]})
+        # Zakres po samym created_at (bez __date), zeby baza mogla uzyc indeksu
+        if name == "created_from":
+            filters["created_at__gte"] = day_start(value)
+        else:
+            filters["created_at__lt"] = day_start(value + datetime.timedelta(days=1))
+
+    statuses = [s for s in (params.get("status") or "").split(",") if s]
+    unknown = [s for s in statuses if s not in OrderStatus.values]
+    if unknown:
+        raise ValidationError({"status": [f"Nieznany status: {', '.join(unknown)}."]})
+    if statuses:
+        filters["status__in"] = statuses
+    return filters
+
+
+def _format(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    # Kwoty jako tekst z dwoma miejscami, tak jak w API - SQLite gubi skale przy mnozeniu
+    if isinstance(value, Decimal):
+        return str(value.quantize(CENT))
+    return value
+
+
+def iter_export_rows(filters, chunk_size=EXPORT_CHUNK_SIZE):
+    orders = Order.objects.filter(**filters)
+    line_total = ExpressionWrapper(
+        F("items__unit_price") * F("items__quantity"),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    columns = [column for _, column in EXPORT_COLUMNS]
+    last_pk = 0
+    while True:
+        # Kazda paczka to osobne krotkie zapytanie po kluczu (keyset), wiec eksport
+        # nie trzyma otwartego kursora ani blokady odczytu przez caly czas wysylania
+        pks = list(
+            orders.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+        )
+        if not pks:
+            return
+        rows = (
+            orders.filter(pk__gte=pks[0], pk__lte=pks[-1])
+            .annotate(line_total=line_total)
+            .order_by("pk", "items__id")
+            .values_list(*columns)
+        )
+        for row in rows:
+            yield [_format(value) for value in row]
+        last_pk = pks[-1]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n"
+
+
+def iter_export(filters, output_format, chunk_size=EXPORT_CHUNK_SIZE):
+    rows = iter_export_rows(filters, chunk_size)
+    return iter_csv(rows) if output_format == "csv" else iter_ndjson(rows)
+
+
+def export_response(request, filters, output_format):
+    # Pod ASGI wiersze przechodza do petli zdarzen paczkami, nie pojedynczo
+    body = streaming_body(request, iter_export(filters, output_format), batch=500)
+    response = StreamingHttpResponse(body, content_type=EXPORT_FORMATS[output_format])
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M%S")
+    response["Content-Disposition"] = f'attachment; filename="orders-{stamp}.{output_format}"'
+    return response
@@ -0,0 +1,37 @@
+from functools import partial
+
+from rest_framework.exceptions import ValidationError
+
+
+def sparse_fields(request, serializer_class):
+    # ?fields=id,name,price - None, gdy klient chce pelna reprezentacje
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in serializer_class().fields]
+    if unknown:
+        raise ValidationError({"fields": [f"Nieznane pola: {', '.join(unknown)}."]})
+    return fields
+
+
+def sparse_serializer(serializer_class, fields):
+    return serializer_class if fields is None else partial(serializer_class, fields=fields)
+
+
+def project_columns(queryset, fields, keep=()):
+    # SELECT tylko kolumn wybranych pol (FK po nazwie pola, np. "category" -> category_id);
+    # keep to kolumny potrzebne widokowi niezaleznie od odpowiedzi (sortowanie, uprawnienia)
+    if fields is None:
+        return queryset
+    concrete = {field.name for field in queryset.model._meta.concrete_fields}
+    return queryset.only("pk", *[name for name in (*fields, *keep) if name in concrete])
+
+
+def wants_field(fields, name):
+    return fields is None or name in fields
+
+
+def sparse_queryset(request, queryset, serializer_class, keep=()):
+    fields = sparse_fields(request, serializer_class)
+    return project_columns(queryset, fields, keep), sparse_serializer(serializer_class, fields)
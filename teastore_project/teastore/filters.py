@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.db.models import Count
+from rest_framework import serializers
+
+from .models import TeaType, CaffeineLevel
+
+_BOOLEAN = serializers.BooleanField()
+_PRICE = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=Decimal(0))
+_ID = serializers.IntegerField(min_value=1)
+_TEA_TYPE = serializers.ChoiceField(choices=TeaType.choices)
+_CAFFEINE = serializers.ChoiceField(choices=CaffeineLevel.choices)
+
+# parametr -> (pole DRF do parsowania, lookup ORM, czy lista rozdzielona przecinkami)
+TEA_FILTERS = {
+    "category": (_ID, "category_id__in", True),
+    "tea_type": (_TEA_TYPE, "tea_type__in", True),
+    "caffeine_level": (_CAFFEINE, "caffeine_level__in", True),
+    "is_active": (_BOOLEAN, "is_active", False),
+    "price_min": (_PRICE, "price__gte", False),
+    "price_max": (_PRICE, "price__lte", False),
+    "organic": (_BOOLEAN, "origin__is_organic", False),
+}
+
+
+def wants_facets(request):
+    return request.query_params.get("facets") in ("1", "true")
+
+
+def filter_teas(queryset, params):
+    filters = {}
+    errors = {}
+    for name, (field, lookup, many) in TEA_FILTERS.items():
+        raw = params.get(name)
+        if raw is None or raw == "":
+            continue
+        try:
+            if many:
+                filters[lookup] = [field.run_validation(value) for value in raw.split(",")]
+            else:
+                filters[lookup] = field.run_validation(raw)
+        except serializers.ValidationError as exc:
+            errors[name] = exc.detail
+    if errors:
+        raise serializers.ValidationError(errors)
+    return queryset.filter(**filters)
+
+
+def _facet(counts, choices=None):
+    labels = dict(choices or [])
+    return [
+        {"value": value, "label": labels.get(value, value), "count": count}
+        for value, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    ]
+
+
+def tea_facets(queryset):
+    # Jedno zapytanie GROUP BY po wszystkich wymiarach naraz, sumy per faseta liczymy tutaj -
+    # grup jest co najwyzej typy x poziomy kofeiny x kategorie
+    groups = (
+        queryset.order_by()
+        .values("tea_type", "caffeine_level", "category_id", "category__name")
+        .annotate(count=Count("id"))
+    )
+    tea_types, caffeine_levels, categories, names = {}, {}, {}, {}
+    for group in groups:
+        count = group["count"]
+        tea_types[group["tea_type"]] = tea_types.get(group["tea_type"], 0) + count
+        level = group["caffeine_level"]
+        caffeine_levels[level] = caffeine_levels.get(level, 0) + count
+        categories[group["category_id"]] = categories.get(group["category_id"], 0) + count
+        names[group["category_id"]] = group["category__name"]
+    return {
+        "tea_type": _facet(tea_types, TeaType.choices),
+        "caffeine_level": _facet(caffeine_levels, CaffeineLevel.choices),
+        "category": _facet(categories, names.items()),
+    }
@@ -1,6 +1,9 @@
+import datetime
+
 from django import forms
 
-from .models import Tea, TeaCategory, Origin, Order, OrderItem
+from .dates import day_start
+from .models import Tea, TeaCategory, Origin, Order, OrderItem, OrderStatus
 
 
 class TeaForm(forms.ModelForm):
@@ -31,3 +34,30 @@ class OrderItemForm(forms.ModelForm):
     class Meta:
         model = OrderItem
         exclude = ["unit_price"]
+
+
+class OrderFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=[("", "Wszystkie")] + OrderStatus.choices, required=False, label="Status"
+    )
+    created_from = forms.DateField(
+        required=False, label="Utworzone od", widget=forms.DateInput(attrs={"type": "date"})
+    )
+    created_to = forms.DateField(
+        required=False, label="Utworzone do", widget=forms.DateInput(attrs={"type": "date"})
+    )
+
+    def filter(self, queryset, prefix=""):
+        # Niepoprawne pola sa pomijane - cleaned_data zawiera tylko poprawne wartosci
+        self.is_valid()
+        data = self.cleaned_data
+        filters = {}
+        if data.get("status"):
+            filters[f"{prefix}status"] = data["status"]
+        # Zakres po samym created_at (bez __date), zeby baza mogla uzyc indeksu
+        if data.get("created_from"):
+            filters[f"{prefix}created_at__gte"] = day_start(data["created_from"])
+        if data.get("created_to"):
+            next_day = data["created_to"] + datetime.timedelta(days=1)
+            filters[f"{prefix}created_at__lt"] = day_start(next_day)
+        return queryset.filter(**filters)
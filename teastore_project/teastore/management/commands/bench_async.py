@@ -0,0 +1,176 @@
+import json
+import logging
+import multiprocessing
+import random
+import socket
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from teastore.benchmarking import (
+    benchmark_database,
+    run_http_load,
+    seed_dataset,
+    summarize_latencies,
+)
+from teastore.models import TeaCategory, Origin, Tea
+
+HOST = "127.0.0.1"
+
+# nazwa -> (trasa synchroniczna, trasa async); {tea}, {category}, {origin} losowane z bazy
+ENDPOINTS = {
+    "tea_list": ("/api/teas/?category={category}", "/api/async/teas/?category={category}"),
+    "tea_detail": ("/api/teas/{tea}/", "/api/async/teas/{tea}/"),
+    "teas_search": ("/api/teas/search/?name={word}", "/api/async/teas/search/?name={word}"),
+    "orders_my": ("/api/orders/my/", "/api/async/orders/my/"),
+    "category_detail": ("/api/categories/{category}/", "/api/async/categories/{category}/"),
+    "origin_detail": ("/api/origins/{origin}/", "/api/async/origins/{origin}/"),
+}
+# tryb -> (serwer, ktora trasa z ENDPOINTS)
+MODES = {
+    "wsgi-sync": ("wsgi", 0),
+    "asgi-async": ("asgi", 1),
+    "asgi-sync": ("asgi", 0),
+}
+SEARCH_WORDS = ["sencha", "assam", "earl", "jasmine", "oolong", "chai"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_wsgi(port):
+    server = ThreadedWSGIServer((HOST, port), _QuietHandler, allow_reuse_address=True)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.shutdown
+
+
+def _start_asgi(port):
+    try:
+        import uvicorn
+    except ImportError:
+        raise CommandError("Tryby ASGI wymagaja uvicorn: pip install uvicorn")
+
+    config = uvicorn.Config(
+        get_asgi_application(), host=HOST, port=port, lifespan="off", log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+
+    return stop
+
+
+class Command(BaseCommand):
+    help = (
+        "Porownuje przepustowosc widokow odczytu: synchronicznych pod serwerem WSGI "
+        "i async (async ORM) pod uvicorn, przy wielu wspolbieznych zadaniach."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teas", type=int, default=5_000)
+        parser.add_argument("--orders", type=int, default=20_000)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=500, help="Zapytan na trase.")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+        parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS))
+        parser.add_argument("--output", help="Plik JSON z wynikami.")
+
+    def handle(self, *args, **options):
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        results = []
+        with benchmark_database():
+            seed_dataset(
+                categories=20,
+                origins=50,
+                teas=options["teas"],
+                orders=options["orders"],
+                users=options["users"],
+                staff=0,
+            )
+            user = User.objects.filter(username__startswith="bench-user-").order_by("pk").first()
+            headers = {"Authorization": f"Token {Token.objects.create(user=user).key}"}
+            samples = self._samples()
+            connection.close()
+
+            # Generator obciazenia w osobnym procesie - nie dzieli GIL z serwerem
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(1) as pool:
+                for mode in options["modes"]:
+                    server, route = MODES[mode]
+                    port = _free_port()
+                    stop = (_start_wsgi if server == "wsgi" else _start_asgi)(port)
+                    try:
+                        for name in options["endpoints"] or ENDPOINTS:
+                            cache.clear()
+                            paths = [ENDPOINTS[name][route].format(**sample) for sample in samples]
+                            latencies, statuses, seconds = pool.apply(
+                                run_http_load,
+                                (HOST, port, paths, headers, options["concurrency"],
+                                 options["requests"]),
+                            )
+                            result = {
+                                "mode": mode,
+                                "endpoint": name,
+                                "concurrency": options["concurrency"],
+                                "throughput_rps": round(len(latencies) / seconds, 2),
+                                "latency": summarize_latencies(latencies),
+                                "status_codes": statuses,
+                            }
+                            results.append(result)
+                            self._report(result)
+                    finally:
+                        stop()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wyniki zapisane w {options['output']}"))
+
+    def _samples(self):
+        rng = random.Random(0)
+        tea_ids = list(Tea.objects.values_list("pk", flat=True)[:1000])
+        category_ids = list(TeaCategory.objects.values_list("pk", flat=True))
+        origin_ids = list(Origin.objects.values_list("pk", flat=True))
+        return [
+            {
+                "tea": rng.choice(tea_ids),
+                "category": rng.choice(category_ids),
+                "origin": rng.choice(origin_ids),
+                "word": rng.choice(SEARCH_WORDS),
+            }
+            for _ in range(200)
+        ]
+
+    def _report(self, result):
+        latency = result["latency"]
+        self.stdout.write(
+            f"{result['mode']:<11} {result['endpoint']:<16} "
+            f"{result['throughput_rps']:>9.1f} req/s  "
+            f"p50 {latency['p50_ms']:>8.1f} ms  p95 {latency['p95_ms']:>8.1f} ms  "
+            f"p99 {latency['p99_ms']:>8.1f} ms  {result['status_codes']}"
+        )
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from teastore.accounts import ensure_user_group
+from teastore.benchmarking import benchmark_database, timer
+from teastore.permissions import user_has_perm
+
+CHECKED_PERMS = ["teastore.view_tea", "teastore.add_order"]
+
+
+class Command(BaseCommand):
+    help = "Porownuje koszt sprawdzania uprawnien na zapytanie: user.has_perm vs cache uprawnien."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        requests = options["requests"]
+        with benchmark_database():
+            user = User.objects.create_user("bench-permissions", password="bench")
+            user.groups.add(ensure_user_group())
+
+            rows = [
+                ("user.has_perm", lambda u, perm: u.has_perm(perm)),
+                ("user_has_perm (cache)", user_has_perm),
+            ]
+            self.stdout.write(f"{'sciezka':<24}{'zapytania/req':>15}{'us/req':>10}")
+            for label, check in rows:
+                queries, seconds = self._run(user.pk, check, requests)
+                self.stdout.write(
+                    f"{label:<24}{queries / requests:>15.2f}{seconds / requests * 1e6:>10.1f}"
+                )
+
+    def _run(self, user_id, check, requests):
+        queries = 0
+        seconds = 0.0
+        for _ in range(requests):
+            # Kazde zapytanie HTTP dostaje swiezy obiekt uzytkownika z uwierzytelniania
+            user = User.objects.get(pk=user_id)
+            with CaptureQueriesContext(connection) as captured, timer() as elapsed:
+                for perm in CHECKED_PERMS:
+                    assert check(user, perm)
+            queries += len(captured)
+            seconds += elapsed["seconds"]
+        return queries, seconds
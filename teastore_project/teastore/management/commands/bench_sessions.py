@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from teastore.benchmarking import benchmark_database, seed_dataset, summarize_latencies, timer
+
+ENDPOINTS = {
+    "tea_list_html": "/api/html/teas/",
+    "orders_my (SessionAuthentication)": "/api/orders/my/",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Porownuje silniki sesji (db, cached_db, signed_cookies): liczbe zapytan SQL "
+        "na zadanie i czas odpowiedzi zalogowanego klienta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300, help="Zapytan na trase.")
+        parser.add_argument("--teas", type=int, default=2_000)
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            choices=list(settings.TEASTORE_SESSION_ENGINES),
+            default=list(settings.TEASTORE_SESSION_ENGINES),
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_dataset(
+                categories=20, origins=20, teas=options["teas"], orders=2_000, users=20, staff=0
+            )
+            user = User.objects.filter(username__startswith="bench-user-").order_by("pk").first()
+
+            self.stdout.write(
+                f"{'profil':<16}{'trasa':<36}{'SQL/req':>9}{'sesja SQL/req':>15}"
+                f"{'p50 ms':>9}{'p95 ms':>9}"
+            )
+            for profile in options["profiles"]:
+                engine = settings.TEASTORE_SESSION_ENGINES[profile]
+                with override_settings(SESSION_ENGINE=engine):
+                    for name, path in ENDPOINTS.items():
+                        self._report(profile, name, self._run(user, path, options["requests"]))
+
+    def _run(self, user, path, requests):
+        cache.clear()
+        # Nowy klient laduje middleware z biezacym SESSION_ENGINE
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(user)
+        client.get(path)
+
+        latencies = []
+        queries = session_queries = 0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured, timer() as elapsed:
+                response = client.get(path)
+            assert response.status_code == 200, response.status_code
+            latencies.append(elapsed["seconds"])
+            queries += len(captured)
+            session_queries += sum("django_session" in q["sql"] for q in captured)
+        return {
+            "queries": queries / requests,
+            "session_queries": session_queries / requests,
+            "latency": summarize_latencies(latencies),
+        }
+
+    def _report(self, profile, name, result):
+        latency = result["latency"]
+        self.stdout.write(
+            f"{profile:<16}{name:<36}{result['queries']:>9.2f}{result['session_queries']:>15.2f}"
+            f"{latency['p50_ms']:>9.2f}{latency['p95_ms']:>9.2f}"
+        )
@@ -0,0 +1,127 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    close_old_connections,
+    connection,
+    connections,
+)
+
+from teastore.benchmarking import benchmark_database, seed_dataset, summarize_latencies, timer
+from teastore.checkout import place_order
+from teastore.models import TeaCategory, Tea, Order
+
+PROFILES = {
+    "default": {"OPTIONS": {}, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+    "production": settings.TEASTORE_SQLITE_PRODUCTION,
+}
+
+
+def _apply_profile(name):
+    # Polaczenia w watkach powstaja z tego samego slownika ustawien
+    connections.close_all()
+    connections.settings[DEFAULT_DB_ALIAS].update(PROFILES[name])
+    if name == "default":
+        # journal_mode=WAL zostaje zapisany w pliku bazy - wracamy do domyslnego dziennika
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=DELETE")
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Porownuje domyslny i produkcyjny profil SQLite (WAL, busy timeout, mmap, "
+        "CONN_MAX_AGE) przy wspolbieznych odczytach katalogu i skladaniu zamowien."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--teas", type=int, default=2_000)
+        parser.add_argument("--orders", type=int, default=20_000)
+        parser.add_argument(
+            "--profiles", nargs="+", choices=sorted(PROFILES), default=["default", "production"]
+        )
+
+    def handle(self, *args, **options):
+        original = {key: connection.settings_dict.get(key) for key in PROFILES["default"]}
+        with benchmark_database():
+            seed_dataset(
+                categories=20,
+                origins=20,
+                teas=options["teas"],
+                orders=options["orders"],
+                users=options["writers"],
+                staff=0,
+            )
+            category_ids = list(TeaCategory.objects.values_list("pk", flat=True))
+            tea_ids = list(Tea.objects.filter(is_active=True).values_list("pk", flat=True))
+            users = list(User.objects.filter(username__startswith="bench-user-"))
+
+            try:
+                for profile in options["profiles"]:
+                    _apply_profile(profile)
+                    self._report(profile, self._run(options, category_ids, tea_ids, users))
+            finally:
+                connections.close_all()
+                connections.settings[DEFAULT_DB_ALIAS].update(original)
+
+    def _run(self, options, category_ids, tea_ids, users):
+        deadline = time.perf_counter() + options["seconds"]
+
+        def read(rng):
+            list(Tea.objects.filter(is_active=True, category_id=rng.choice(category_ids))[:50])
+            list(Order.objects.filter(user=rng.choice(users))[:20])
+
+        def write(rng):
+            place_order(rng.choice(users), [{"tea": rng.choice(tea_ids), "quantity": 1}])
+
+        def worker(operation, seed):
+            rng = random.Random(seed)
+            latencies = []
+            locked = 0
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        operation(rng)
+                    except OperationalError:
+                        locked += 1
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                    # Koniec "zadania" - jak po odpowiedzi HTTP, polaczenie zamykane wg CONN_MAX_AGE
+                    close_old_connections()
+            finally:
+                connection.close()
+            return operation, latencies, locked
+
+        jobs = [read] * options["readers"] + [write] * options["writers"]
+        with timer() as elapsed, ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            outcomes = list(pool.map(worker, jobs, range(len(jobs))))
+
+        result = {}
+        for name, operation in (("odczyty", read), ("zapisy", write)):
+            latencies = [value for op, values, _ in outcomes if op is operation for value in values]
+            result[name] = {
+                "per_second": len(latencies) / elapsed["seconds"],
+                "locked": sum(locked for op, _, locked in outcomes if op is operation),
+                "latency": summarize_latencies(latencies),
+            }
+        return result
+
+    def _report(self, profile, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"profil: {profile}"))
+        for name, stats in result.items():
+            latency = stats["latency"]
+            self.stdout.write(
+                f"  {name:<8} {stats['per_second']:>9.1f} /s  "
+                f"p50 {latency['p50_ms']:>8.2f} ms  p95 {latency['p95_ms']:>8.2f} ms  "
+                f"p99 {latency['p99_ms']:>8.2f} ms  database is locked: {stats['locked']}"
+            )
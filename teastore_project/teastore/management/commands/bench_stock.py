@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from teastore.benchmarking import benchmark_database, timer
+from teastore.models import TeaCategory, Tea, TeaType, CaffeineLevel
+from teastore.stock import InsufficientStock, reserve_stock
+
+
+def _naive_reserve(tea_id, quantity):
+    # Odczyt i zapis osobno - tak wygladaloby "doklejone" zdejmowanie stanu
+    stock_qty = Tea.objects.values_list("stock_qty", flat=True).get(pk=tea_id)
+    if stock_qty < quantity:
+        raise InsufficientStock([])
+    Tea.objects.filter(pk=tea_id).update(stock_qty=stock_qty - quantity)
+
+
+class Command(BaseCommand):
+    help = (
+        "Wielowatkowy test rezerwacji stanu jednej herbaty: sprawdza, ze nie ma "
+        "nadsprzedazy, i mierzy liczbe rezerwacji na sekunde."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--stock", type=int, default=2000)
+        parser.add_argument("--quantity", type=int, default=1)
+        parser.add_argument(
+            "--naive",
+            action="store_true",
+            help="Dla porownania: odczyt i zapis stanu bez warunkowego UPDATE.",
+        )
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        quantity = options["quantity"]
+        reserve = _naive_reserve if options["naive"] else (
+            lambda tea_id, qty: reserve_stock([(tea_id, qty)])
+        )
+
+        with benchmark_database():
+            category = TeaCategory.objects.create(name="Benchmark")
+            tea = Tea.objects.create(
+                name="Goraca herbata",
+                category=category,
+                tea_type=TeaType.BLACK,
+                caffeine_level=CaffeineLevel.HIGH,
+                price=10,
+                stock_qty=options["stock"],
+            )
+            connection.close()
+
+            def worker():
+                reserved = lock_retries = 0
+                try:
+                    while True:
+                        try:
+                            reserve(tea.pk, quantity)
+                        except InsufficientStock:
+                            return reserved, lock_retries
+                        except OperationalError:
+                            lock_retries += 1
+                        else:
+                            reserved += 1
+                finally:
+                    connection.close()
+
+            with timer() as elapsed, ThreadPoolExecutor(max_workers=threads) as pool:
+                futures = [pool.submit(worker) for _ in range(threads)]
+                results = [future.result() for future in futures]
+
+            reserved = sum(result[0] for result in results)
+            lock_retries = sum(result[1] for result in results)
+            final_stock = Tea.objects.values_list("stock_qty", flat=True).get(pk=tea.pk)
+            oversold = reserved * quantity - options["stock"]
+
+            self.stdout.write(f"watki:              {threads}")
+            self.stdout.write(f"stan poczatkowy:    {options['stock']}")
+            self.stdout.write(f"udane rezerwacje:   {reserved}")
+            self.stdout.write(f"stan koncowy:       {final_stock}")
+            self.stdout.write(f"nadsprzedaz:        {max(oversold, 0)}")
+            self.stdout.write(f"ponowienia (lock):  {lock_retries}")
+            self.stdout.write(f"czas:               {elapsed['seconds']:.2f} s")
+            self.stdout.write(f"rezerwacje/s:       {reserved / elapsed['seconds']:.0f}")
+
+            if oversold > 0 or final_stock != options["stock"] - reserved * quantity:
+                raise CommandError("Wykryto nadsprzedaz stanu magazynowego.")
@@ -0,0 +1,363 @@
+import csv
+import io
+import itertools
+import json
+import logging
+import platform
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern
+from rest_framework.authtoken.models import Token
+
+from teastore import urls as teastore_urls
+from teastore.benchmarking import (
+    BENCHMARK_PASSWORD,
+    benchmark_database,
+    seed_dataset,
+    summarize_latencies,
+    timer,
+)
+from teastore.models import TeaCategory, Origin, Tea, Order, OrderItem
+from teastore.serializers import TeaSerializer
+
+URL_PREFIX = "/api/"
+
+# Widoki dostepne tylko dla obslugi sklepu
+STAFF_VIEWS = {
+    "register_users_bulk",
+    "metrics",
+    "order_export",
+    "tea_update_delete",
+    "tea_import",
+    "tea_create_html",
+    "category_list_html",
+    "category_create_html",
+    "origin_list_html",
+    "origin_create_html",
+}
+# Widoki, ktore wylogowuja albo loguja - dostaja za kazdym razem nowego klienta
+ANONYMOUS_VIEWS = {"register_user", "user_login", "user_logout"}
+
+
+class Scenario:
+    def __init__(
+        self,
+        name,
+        route,
+        method="GET",
+        query=None,
+        payload=None,
+        multipart=False,
+        role="user",
+    ):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.query = query or {}
+        self.payload = payload
+        self.multipart = multipart
+        self.role = role
+        self.pks = []
+
+
+class Command(BaseCommand):
+    help = (
+        "Generuje syntetyczny zbior danych i obciaza wspolbieznie kazda trase z teastore/urls.py, "
+        "raportujac przepustowosc i opoznienia p50/p95/p99. Wynik trafia do pliku JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--origins", type=int, default=50)
+        parser.add_argument("--teas", type=int, default=100_000)
+        parser.add_argument("--orders", type=int, default=1_000_000)
+        parser.add_argument("--items-per-order", type=int, default=1)
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--staff", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--requests", type=int, default=200, help="Zapytan na trase.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--routes", nargs="*", help="Tylko wybrane widoki (nazwy funkcji).")
+        parser.add_argument("--database", help="Plik bazy benchmarku.")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Zachowaj baze i uzyj ponownie wygenerowanych danych.",
+        )
+        parser.add_argument("--output", default="benchmark-results.json")
+
+    def handle(self, *args, **options):
+        with benchmark_database(name=options["database"], keepdb=options["keepdb"]):
+            if options["keepdb"] and Tea.objects.exists():
+                self.stdout.write("Uzywam istniejacych danych benchmarku.")
+            else:
+                with timer() as elapsed:
+                    seed_dataset(
+                        categories=options["categories"],
+                        origins=options["origins"],
+                        teas=options["teas"],
+                        orders=options["orders"],
+                        items_per_order=options["items_per_order"],
+                        users=options["users"],
+                        staff=options["staff"],
+                        seed=options["seed"],
+                        log=self.stdout.write,
+                    )
+                self.stdout.write(f"Dane gotowe w {elapsed['seconds']:.1f} s")
+
+            rng = random.Random(options["seed"])
+            user = User.objects.filter(username__startswith="bench-user-").order_by("pk").first()
+            staff = User.objects.filter(is_staff=True).order_by("pk").first()
+            tokens = {
+                "user": Token.objects.get_or_create(user=user)[0].key,
+                "staff": Token.objects.get_or_create(user=staff)[0].key,
+            }
+            accounts = {"user": user, "staff": staff}
+            scenarios = self._scenarios(rng, user)
+            if options["routes"]:
+                scenarios = [s for s in scenarios if s.name in options["routes"]]
+            connection.close()
+            # Oczekiwane 4xx (np. 409 przy braku stanu) nie zasmiecaja wyjscia
+            logging.getLogger("django.request").setLevel(logging.ERROR)
+
+            results = []
+            rejected = []
+            for scenario in scenarios:
+                result = self._run(
+                    scenario, accounts, tokens, options["requests"], options["concurrency"], rng
+                )
+                results.append(result)
+                self.stdout.write(
+                    f"{scenario.method:<6} {scenario.route:<40} "
+                    f"{result['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {result['latency']['p50_ms']:>8.1f} ms  "
+                    f"p95 {result['latency']['p95_ms']:>8.1f} ms  "
+                    f"p99 {result['latency']['p99_ms']:>8.1f} ms  "
+                    f"{result['status_codes']}"
+                )
+                # Same odmowy (4xx) albo bledy mierza odrzucenie zapytania, a nie prace widoku
+                if not any(code[0] in "23" for code in result["status_codes"]):
+                    rejected.append(scenario.name)
+                    self.stderr.write(
+                        self.style.WARNING(
+                            f"{scenario.name}: brak udanych odpowiedzi {result['status_codes']}"
+                        )
+                    )
+
+            report = {
+                "meta": self._meta(options),
+                "dataset": {
+                    "categories": TeaCategory.objects.count(),
+                    "origins": Origin.objects.count(),
+                    "teas": Tea.objects.count(),
+                    "orders": Order.objects.count(),
+                    "order_items": OrderItem.objects.count(),
+                    "users": User.objects.count(),
+                },
+                "results": results,
+            }
+        with open(options["output"], "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wyniki zapisane w {options['output']}"))
+        if rejected:
+            raise CommandError(f"Trasy bez udanych odpowiedzi: {', '.join(rejected)}")
+
+    def _scenarios(self, rng, user):
+        tea_ids = list(Tea.objects.filter(is_active=True).values_list("pk", flat=True)[:1000])
+        own_orders = Order.objects.filter(user=user)
+        pk_pools = {
+            "teas": tea_ids,
+            "categories": list(TeaCategory.objects.values_list("pk", flat=True)),
+            "origins": list(Origin.objects.values_list("pk", flat=True)),
+            "orders": list(own_orders.values_list("pk", flat=True)[:1000]),
+            "order-items": list(
+                OrderItem.objects.filter(order__in=own_orders).values_list("pk", flat=True)[:1000]
+            ),
+        }
+        tea_payload = TeaSerializer(Tea.objects.get(pk=tea_ids[0])).data
+        tea_payload = {k: v for k, v in tea_payload.items() if k not in ("id", "added_at")}
+        import_csv = self._import_csv(tea_ids[:50])
+        signup_prefix = f"bench-signup-{time.time_ns()}"
+        signups = itertools.count()
+
+        def username():
+            return f"{signup_prefix}-{next(signups)}"
+
+        def checkout_payload():
+            teas = rng.sample(tea_ids, 2)
+            return {"items": [{"tea": tea, "quantity": 1} for tea in teas]}
+
+        special = {
+            "register_user": dict(
+                method="POST",
+                payload=lambda: {"username": username(), "password": BENCHMARK_PASSWORD},
+            ),
+            "register_users_bulk": dict(
+                method="POST",
+                payload=lambda: [{"username": username()} for _ in range(10)],
+            ),
+            "tea_update_delete": dict(method="PUT", payload=lambda: tea_payload),
+            "tea_import": dict(
+                method="POST",
+                multipart=True,
+                payload=lambda: {"file": SimpleUploadedFile("katalog.csv", import_csv)},
+            ),
+            "order_checkout": dict(method="POST", payload=checkout_payload),
+            "teas_search": dict(query={"name": "sencha"}),
+            "teas_search_async": dict(query={"name": "sencha"}),
+        }
+
+        scenarios = []
+        for pattern in teastore_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            # @api_view opakowuje funkcje w widok o nazwie "view" - nazwe niesie view_class
+            name = getattr(pattern.callback, "view_class", pattern.callback).__name__
+            route = URL_PREFIX + str(pattern.pattern)
+            role = "staff" if name in STAFF_VIEWS else "user"
+            if name in ANONYMOUS_VIEWS:
+                role = "anonymous"
+            scenario = Scenario(name, route, role=role, **special.get(name, {}))
+            resource = route[len(URL_PREFIX):].split("/")
+            resource = resource[1] if resource[0] in ("html", "async") else resource[0]
+            if "<" in route:
+                scenario.pks = pk_pools.get(resource) or pk_pools["teas"]
+            scenarios.append(scenario)
+        return scenarios
+
+    def _import_csv(self, tea_ids):
+        # Aktualizacja istniejacych herbat - powtarzany import nie rozrasta katalogu
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(
+            [
+                "name", "description", "category", "tea_type", "caffeine_level", "price",
+                "stock_qty", "is_active", "origin_country_code", "origin_region",
+                "origin_farm_name", "origin_is_organic",
+            ]
+        )
+        teas = Tea.objects.filter(pk__in=tea_ids).select_related("category", "origin")
+        for tea in teas:
+            origin = tea.origin
+            writer.writerow(
+                [
+                    tea.name,
+                    tea.description,
+                    tea.category.name,
+                    tea.tea_type,
+                    tea.caffeine_level,
+                    tea.price,
+                    tea.stock_qty,
+                    tea.is_active,
+                    origin.country_code if origin else "",
+                    origin.region if origin else "",
+                    origin.farm_name if origin else "",
+                    origin.is_organic if origin else "",
+                ]
+            )
+        return output.getvalue().encode()
+
+    def _path(self, scenario, rng):
+        path = scenario.route
+        if "<" in path:
+            prefix, rest = path.split("<", 1)
+            path = prefix + str(rng.choice(scenario.pks)) + rest.split(">", 1)[1]
+        return path
+
+    def _client(self, role, accounts, tokens, html):
+        # Wyjatek widoku liczymy jako 500 zamiast przerywac caly pomiar
+        client = Client(raise_request_exception=False, HTTP_HOST="localhost")
+        if role == "anonymous":
+            # Kazdy anonimowy klient z innego adresu - inaczej limity logowania i rejestracji
+            # (teastore/throttling.py) odrzucilyby wiekszosc zapytan
+            client.defaults["REMOTE_ADDR"] = ".".join(
+                str(random.randrange(1, 255)) for _ in range(4)
+            )
+            return client
+        if html:
+            client.force_login(accounts[role])
+        else:
+            client.defaults["HTTP_AUTHORIZATION"] = f"Token {tokens[role]}"
+        return client
+
+    def _run(self, scenario, accounts, tokens, requests, concurrency, rng):
+        html = "/html/" in scenario.route
+        per_worker = max(1, requests // concurrency)
+
+        def worker(worker_rng):
+            client = self._client(scenario.role, accounts, tokens, html)
+            latencies = []
+            statuses = {}
+            try:
+                for _ in range(per_worker):
+                    if scenario.role == "anonymous":
+                        client = self._client(scenario.role, accounts, tokens, html)
+                    path = self._path(scenario, worker_rng)
+                    kwargs = {"data": scenario.query} if scenario.query else {}
+                    if scenario.multipart:
+                        kwargs = {"data": scenario.payload()}
+                    elif scenario.payload is not None:
+                        kwargs = {
+                            "data": json.dumps(scenario.payload()),
+                            "content_type": "application/json",
+                        }
+                    start = time.perf_counter()
+                    response = getattr(client, scenario.method.lower())(path, **kwargs)
+                    if getattr(response, "streaming", False):
+                        for _ in response.streaming_content:
+                            pass
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            finally:
+                connection.close()
+            return latencies, statuses
+
+        seeds = [rng.random() for _ in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda s: worker(random.Random(s)), seeds))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for outcome in outcomes for latency in outcome[0]]
+        statuses = {}
+        for _, worker_statuses in outcomes:
+            for code, count in worker_statuses.items():
+                statuses[str(code)] = statuses.get(str(code), 0) + count
+        return {
+            "view": scenario.name,
+            "route": scenario.route,
+            "method": scenario.method,
+            "role": scenario.role,
+            "concurrency": concurrency,
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency": summarize_latencies(latencies),
+            "status_codes": statuses,
+        }
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "requests_per_route": options["requests"],
+            "concurrency": options["concurrency"],
+            "seed": options["seed"],
+        }
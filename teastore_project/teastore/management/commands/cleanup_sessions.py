@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+CLEANUP_BATCH_SIZE = getattr(settings, "TEASTORE_SESSION_CLEANUP_BATCH_SIZE", 1000)
+
+
+def delete_expired_sessions(batch_size=None, pause=0.0):
+    # Male paczki zamiast jednego DELETE (jak w clearsessions) - kazda paczka to krotka
+    # transakcja, wiec zapisy sesji z ruchu HTML nie czekaja na blokade zapisu SQLite
+    batch_size = batch_size or CLEANUP_BATCH_SIZE
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now).values_list("pk", flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(pk__in=keys).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = "Usuwa wygasle sesje z tabeli django_session paczkami."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--pause", type=float, default=0.0, help="Przerwa miedzy paczkami w sekundach."
+        )
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_sessions(options["batch_size"], options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Usunieto {deleted} wygaslych sesji."))
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from teastore.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_filters, iter_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Eksportuje zamowienia z pozycjami (herbata, uzytkownik, wartosc pozycji) do CSV "
+        "lub NDJSON, paczkami po kluczu - zuzycie pamieci nie zalezy od liczby wierszy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--created-from", help="RRRR-MM-DD, wlacznie.")
+        parser.add_argument("--created-to", help="RRRR-MM-DD, wlacznie.")
+        parser.add_argument("--status", help="Jeden lub kilka statusow rozdzielonych przecinkiem.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--output", help="Plik wynikowy (domyslnie standardowe wyjscie).")
+
+    def handle(self, *args, **options):
+        try:
+            filters = export_filters(options)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        chunks = iter_export(filters, options["output_format"], options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
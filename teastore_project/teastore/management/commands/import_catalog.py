@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from teastore.catalog_import import FILE_FORMATS, detect_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Importuje katalog herbat z pliku CSV lub NDJSON w paczkach. Kategorie i pochodzenia "
+        "sa dopasowywane po kluczu naturalnym, herbaty po nazwie (dodanie lub aktualizacja)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=sorted(set(FILE_FORMATS.values())))
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Nie rozpoznano formatu pliku - uzyj --format csv|ndjson.")
+
+        with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+            report = import_catalog(stream, file_format, batch_size=options["batch_size"])
+
+        for error in report["errors"]:
+            self.stderr.write(f"linia {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Dodano {report['created']}, zaktualizowano {report['updated']} herbat "
+                f"(nowe kategorie: {report['categories_created']}, "
+                f"nowe pochodzenia: {report['origins_created']}, "
+                f"bledne wiersze: {report['invalid']})."
+            )
+        )
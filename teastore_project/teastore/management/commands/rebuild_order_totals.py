@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from teastore.totals import rebuild_order_totals
+
+
+class Command(BaseCommand):
+    help = "Przelicza Order.total_amount i Order.item_count jednym zapytaniem agregujacym."
+
+    def handle(self, *args, **options):
+        updated = rebuild_order_totals()
+        self.stdout.write(self.style.SUCCESS(f"Przeliczono sumy {updated} zamowien."))
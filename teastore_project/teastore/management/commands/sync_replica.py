@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from teastore.routers import REPLICA_ALIAS
+
+
+def copy_database(source_path, target_path):
+    # Backup API kopiuje spojny obraz bazy; czytelnicy repliki widza stara albo nowa wersje
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Command(BaseCommand):
+    help = "Kopiuje baze glowna do repliki (SQLite backup API), jednorazowo albo co --interval s."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Powtarzaj kopiowanie co N sekund.")
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.settings:
+            raise CommandError("Brak bazy 'replica' w DATABASES - ustaw TEASTORE_REPLICA_NAME.")
+        source = connections[DEFAULT_DB_ALIAS].settings_dict["NAME"]
+        target = connections[REPLICA_ALIAS].settings_dict["NAME"]
+
+        while True:
+            start = time.perf_counter()
+            copy_database(source, target)
+            self.stdout.write(
+                f"Skopiowano {source} -> {target} w {time.perf_counter() - start:.2f} s"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,164 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+class MetricsRegistry:
+    # Liczniki w pamieci procesu - przy kilku workerach kazdy zbiera swoje
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, seconds, sql_queries, sql_seconds, render_seconds):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.requests += 1
+            metrics.latency_sum += seconds
+            metrics.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            metrics.sql_queries += sql_queries
+            metrics.sql_seconds += sql_seconds
+            metrics.render_seconds += render_seconds
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render_prometheus(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            def family(name, kind, help_text, samples):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+
+            family(
+                "teastore_requests_total",
+                "counter",
+                "Liczba obsluzonych zapytan HTTP.",
+                [f'teastore_requests_total{{view="{_label(v)}"}} {m.requests}' for v, m in views],
+            )
+
+            histogram = []
+            for view, metrics in views:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, metrics.latency_buckets):
+                    cumulative += count
+                    histogram.append(
+                        f'teastore_request_duration_seconds_bucket{{view="{_label(view)}",'
+                        f'le="{bound}"}} {cumulative}'
+                    )
+                histogram.append(
+                    f'teastore_request_duration_seconds_bucket{{view="{_label(view)}",le="+Inf"}} '
+                    f"{metrics.requests}"
+                )
+                histogram.append(
+                    f'teastore_request_duration_seconds_sum{{view="{_label(view)}"}} '
+                    f"{metrics.latency_sum:.6f}"
+                )
+                histogram.append(
+                    f'teastore_request_duration_seconds_count{{view="{_label(view)}"}} '
+                    f"{metrics.requests}"
+                )
+            family(
+                "teastore_request_duration_seconds",
+                "histogram",
+                "Czas obslugi zapytania HTTP.",
+                histogram,
+            )
+
+            family(
+                "teastore_sql_queries_total",
+                "counter",
+                "Liczba zapytan SQL wykonanych podczas obslugi widoku.",
+                [
+                    f'teastore_sql_queries_total{{view="{_label(v)}"}} {m.sql_queries}'
+                    for v, m in views
+                ],
+            )
+            family(
+                "teastore_sql_duration_seconds_total",
+                "counter",
+                "Laczny czas zapytan SQL widoku.",
+                [
+                    f'teastore_sql_duration_seconds_total{{view="{_label(v)}"}} {m.sql_seconds:.6f}'
+                    for v, m in views
+                ],
+            )
+            family(
+                "teastore_render_duration_seconds_total",
+                "counter",
+                "Laczny czas renderowania odpowiedzi (serializacja JSON / szablony).",
+                [
+                    f'teastore_render_duration_seconds_total{{view="{_label(v)}"}} '
+                    f"{m.render_seconds:.6f}"
+                    for v, m in views
+                ],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+class RenderTimer:
+    # Czas renderowania biezacego zadania; zagniezdzone pomiary (szablon w odpowiedzi,
+    # serializer zagniezdzony w innym) liczy tylko zewnetrzny
+    def __init__(self):
+        self.seconds = 0.0
+        self._depth = 0
+        self._start = 0.0
+
+    def __enter__(self):
+        if not self._depth:
+            self._start = time.perf_counter()
+        self._depth += 1
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if not self._depth:
+            self.seconds += time.perf_counter() - self._start
+
+
+class _NoTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_render_timer = ContextVar("teastore_render_timer", default=_NoTimer())
+
+
+def track_render():
+    timer = RenderTimer()
+    return timer, _render_timer.set(timer)
+
+
+def stop_tracking_render(token):
+    _render_timer.reset(token)
+
+
+def render_timer():
+    return _render_timer.get()
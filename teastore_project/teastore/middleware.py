@@ -0,0 +1,132 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import registry, render_timer, stop_tracking_render, track_render
+from .routers import PIN_COOKIE, PIN_SECONDS, reset_replica, use_replica
+
+
+class _SqlRecorder:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - start
+
+
+_sql_recorder = ContextVar("teastore_sql_recorder", default=None)
+
+
+def _record_sql(execute, sql, params, many, context):
+    recorder = _sql_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_sql_recorder(connection):
+    # Stala obwoluta na kazdym polaczeniu, takze w watkach sync_to_async widokow async -
+    # connection.execute_wrapper() objalby tylko polaczenia watku middleware. Zapytanie
+    # trafia do licznika zadania przez zmienna kontekstowa, ktora sync_to_async przenosi
+    # do watku. Na poczatku listy, zeby nie zaburzyc zdejmowania execute_wrapper().
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_sql)
+
+
+class MetricsMiddleware:
+    # Obsluguje tez lancuch async (ASGI) - inaczej Django uruchamialby widoki async w watku
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self._recording(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with self._recording(request):
+            return await self.get_response(request)
+
+    @contextmanager
+    def _recording(self, request):
+        sql = _SqlRecorder()
+        sql_token = _sql_recorder.set(sql)
+        render, render_token = track_render()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stop_tracking_render(render_token)
+            _sql_recorder.reset(sql_token)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unresolved"
+        registry.observe(view, elapsed, sql.queries, sql.seconds, render.seconds)
+
+    def process_template_response(self, request, response):
+        # Odpowiedzi DRF (JSONRenderer) i TemplateResponse renderuja sie zaraz po tym haku;
+        # szablony z render() i serializery mierza TimedDjangoTemplates i RenderTimingMixin
+        render = response.render
+
+        def timed_render():
+            with render_timer():
+                return render()
+
+        response.render = timed_render
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    # GET/HEAD czytaja z repliki. Po zapisie klient dostaje na chwile ciasteczko, z ktorym
+    # kolejne zadania (np. przekierowanie po formularzu) czytaja z bazy glownej.
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        safe = request.method in self.SAFE_METHODS
+        token = use_replica(safe and PIN_COOKIE not in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        safe = request.method in self.SAFE_METHODS
+        token = use_replica(safe and PIN_COOKIE not in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_replica(token)
+        return self._pin(request, response)
+
+    def _pin(self, request, response):
+        if request.method not in self.SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=PIN_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
@@ -0,0 +1,90 @@
+from django.db import migrations
+
+FTS_TABLE = "teastore_tea_fts"
+
+TEA_DOCUMENT = """
+    SELECT new.id, new.name, new.description,
+        (SELECT name FROM teastore_teacategory WHERE id = new.category_id),
+        (SELECT country_code || ' ' || region || ' ' || farm_name
+            FROM teastore_origin WHERE id = new.origin_id)
+"""
+
+CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, description, category, origin,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, description, category, origin)
+    SELECT tea.id, tea.name, tea.description, category.name,
+        origin.country_code || ' ' || origin.region || ' ' || origin.farm_name
+    FROM teastore_tea AS tea
+    JOIN teastore_teacategory AS category ON category.id = tea.category_id
+    LEFT JOIN teastore_origin AS origin ON origin.id = tea.origin_id
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_tea_insert AFTER INSERT ON teastore_tea BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, description, category, origin) {TEA_DOCUMENT};
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_tea_update
+    AFTER UPDATE OF name, description, category_id, origin_id ON teastore_tea BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, name, description, category, origin) {TEA_DOCUMENT};
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_tea_delete AFTER DELETE ON teastore_tea BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_category_update AFTER UPDATE OF name ON teastore_teacategory BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM teastore_tea WHERE category_id = new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_origin_update
+    AFTER UPDATE OF country_code, region, farm_name ON teastore_origin BEGIN
+        UPDATE {FTS_TABLE}
+        SET origin = new.country_code || ' ' || new.region || ' ' || new.farm_name
+        WHERE rowid IN (SELECT id FROM teastore_tea WHERE origin_id = new.id);
+    END
+    """,
+]
+
+DROP_STATEMENTS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_origin_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_category_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_tea_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_tea_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_tea_insert",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # FTS5 jest tylko w SQLite - na innych bazach wyszukiwarka uzywa icontains
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teastore', '0003_alter_order_created_at_alter_order_delivery_date_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run_on_sqlite(CREATE_STATEMENTS), _run_on_sqlite(DROP_STATEMENTS)),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:02
+
+from decimal import Decimal
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_order_totals(apps, schema_editor):
+    Order = apps.get_model("teastore", "Order")
+    OrderItem = apps.get_model("teastore", "OrderItem")
+    items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    line_total = ExpressionWrapper(
+        F("unit_price") * F("quantity"), output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    )
+    Order.objects.update(
+        total_amount=Coalesce(
+            Subquery(items.annotate(total=Sum(line_total)).values("total")),
+            Value(Decimal("0")),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        item_count=Coalesce(Subquery(items.annotate(count=Count("pk")).values("count")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teastore', '0004_tea_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba pozycji'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Wartosc'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(0.01)], verbose_name='Cena jednostkowa'),
+        ),
+        migrations.AlterField(
+            model_name='tea',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(0.01)], verbose_name='Cena'),
+        ),
+        migrations.RunPython(populate_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teastore', '0005_order_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tea',
+            index=models.Index(fields=['is_active', 'category', 'price'], name='tea_active_cat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tea',
+            index=models.Index(fields=['price'], name='tea_price_idx'),
+        ),
+    ]
@@ -63,6 +63,15 @@ class Tea(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="Aktywna")
     added_at = models.DateField(auto_now_add=True, verbose_name="Data dodania")
 
+    class Meta:
+        # Filtry katalogu (tea_list): aktywnosc, kategoria, zakres cen
+        indexes = [
+            models.Index(
+                fields=["is_active", "category", "price"], name="tea_active_cat_price_idx"
+            ),
+            models.Index(fields=["price"], name="tea_price_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -90,6 +99,21 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
     delivery_date = models.DateField(null=True, blank=True, verbose_name="Data dostawy")
     note = models.TextField(blank=True, verbose_name="Notatka")
+    # Utrzymywane przyrostowo przez sygnaly OrderItem (teastore/totals.py)
+    total_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False, verbose_name="Wartosc"
+    )
+    item_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Liczba pozycji"
+    )
+
+    class Meta:
+        # Zamowienia uzytkownika od najnowszych (order_list, orders_my, pozycje po order__user)
+        # oraz zakresy dat w eksporcie
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="order_user_created_idx"),
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.pk}"
@@ -113,5 +137,13 @@ class OrderItem(models.Model):
             models.UniqueConstraint(fields=["order", "tea"], name="unique_order_item")
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Zapamietana wartosc z bazy - sygnaly licza z niej roznice dla Order.total_amount
+        if {"order_id", "quantity", "unit_price"} <= set(field_names):
+            instance._loaded_line = (instance.order_id, instance.unit_price * instance.quantity)
+        return instance
+
     def __str__(self):
         return f"{self.order_id} - {self.tea}"
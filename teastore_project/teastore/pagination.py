@@ -0,0 +1,36 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    page_size = getattr(settings, "TEASTORE_PAGE_SIZE", 50)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "TEASTORE_MAX_PAGE_SIZE", 500)
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+class SearchPagination(PageNumberPagination):
+    # Wyniki wyszukiwania sa sortowane wg trafnosci, wiec kursor po kluczu nie ma sensu
+    page_size = getattr(settings, "TEASTORE_PAGE_SIZE", 50)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "TEASTORE_MAX_PAGE_SIZE", 500)
+
+
+def wants_pagination(request):
+    return "cursor" in request.query_params or "page_size" in request.query_params
+
+
+def paginated_response(request, queryset, serializer_class, ordering):
+    paginator = KeysetPagination(ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+def search_paginated_response(request, results, serializer_class):
+    paginator = SearchPagination()
+    page = paginator.paginate_queryset(results, request)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
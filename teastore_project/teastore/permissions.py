@@ -1,10 +1,85 @@
 import copy
+import time
 
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import permissions
 
+PERMISSION_VERSION_KEY = "teastore:perms:version"
+PERMISSION_CACHE_TIMEOUT = getattr(settings, "TEASTORE_PERMISSION_CACHE_TIMEOUT", 3600)
+
 
 class CustomDjangoModelPermissions(permissions.DjangoModelPermissions):
     def __init__(self):
         super().__init__()
         self.perms_map = copy.deepcopy(self.perms_map)
         self.perms_map["GET"] = ["%(app_label)s.view_%(model_name)s"]
+
+
+def _permission_version():
+    version = cache.get(PERMISSION_VERSION_KEY)
+    if version is None:
+        # Nowa wartosc po utracie klucza, zeby nie ozywic starych wpisow
+        version = time.time_ns()
+        cache.add(PERMISSION_VERSION_KEY, version, None)
+        version = cache.get(PERMISSION_VERSION_KEY, version)
+    return version
+
+
+async def _apermission_version():
+    version = await cache.aget(PERMISSION_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        await cache.aadd(PERMISSION_VERSION_KEY, version, None)
+        version = await cache.aget(PERMISSION_VERSION_KEY, version)
+    return version
+
+
+def _user_permissions_key(user_id, version):
+    return f"teastore:perms:{version}:{user_id}"
+
+
+def bump_permission_version():
+    try:
+        cache.incr(PERMISSION_VERSION_KEY)
+    except ValueError:
+        cache.set(PERMISSION_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_user_permissions(user_ids):
+    version = _permission_version()
+    cache.delete_many([_user_permissions_key(user_id, version) for user_id in user_ids])
+
+
+def get_user_permissions(user):
+    key = _user_permissions_key(user.pk, _permission_version())
+    perms = cache.get(key)
+    if perms is None:
+        perms = user.get_all_permissions()
+        cache.set(key, perms, PERMISSION_CACHE_TIMEOUT)
+    return perms
+
+
+def user_has_perm(user, perm):
+    if not user.is_active or not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    return perm in get_user_permissions(user)
+
+
+async def aget_user_permissions(user):
+    key = _user_permissions_key(user.pk, await _apermission_version())
+    perms = await cache.aget(key)
+    if perms is None:
+        perms = await user.aget_all_permissions()
+        await cache.aset(key, perms, PERMISSION_CACHE_TIMEOUT)
+    return perms
+
+
+async def auser_has_perm(user, perm):
+    if not user.is_active or not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    return perm in await aget_user_permissions(user)
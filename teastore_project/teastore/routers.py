@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "teastore_primary"
+PIN_SECONDS = getattr(settings, "TEASTORE_REPLICA_PIN_SECONDS", 10)
+# Sesje, tokeny i konta sa czytane przy kazdym zadaniu i nie moga sie spozniac
+# (swiezo zalogowany uzytkownik bylby wylogowany do czasu kopii repliki)
+PRIMARY_ONLY_APPS = {"auth", "authtoken", "contenttypes", "sessions"}
+
+# Ustawiane przez ReplicaRoutingMiddleware tylko na czas bezpiecznych zadan (GET/HEAD).
+# Poza zadaniami (komendy, migracje, sygnaly) wszystko idzie do bazy glownej.
+_read_from_replica = ContextVar("teastore_read_from_replica", default=False)
+
+
+def use_replica(value):
+    return _read_from_replica.set(value)
+
+
+def reset_replica(token):
+    _read_from_replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    # Dane trafiajace do cache czytamy z bazy glownej - replika moze jeszcze nie miec zapisu,
+    # po ktorym podbito wersje, a stare wiersze zostalyby zapisane pod nowym kluczem
+    token = use_replica(False)
+    try:
+        yield
+    finally:
+        reset_replica(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS or not _read_from_replica.get():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Po pierwszym zapisie reszta zadania czyta juz z bazy glownej (read-your-writes)
+        _read_from_replica.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replika dostaje schemat razem z danymi przy kopiowaniu (sync_replica)
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,75 @@
+import re
+
+from django.db import connection, connections
+
+from .models import Tea
+
+FTS_TABLE = "teastore_tea_fts"
+
+# Wagi bm25 dla kolumn: name, description, category, origin
+RANK_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+_fts_available = None
+
+
+def search_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def build_match_query(text):
+    # Kazde slowo jako fraza w cudzyslowie z prefiksem - znaki specjalne FTS5 nie przechodza
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+# Leniwa lista herbat pasujacych do zapytania, posortowana wg trafnosci - Paginator
+# pobiera tylko potrzebny wycinek
+class TeaSearchResults:
+    def __init__(self, text, queryset=None):
+        self.match = build_match_query(text)
+        queryset = Tea.objects.all() if queryset is None else queryset
+        # FTS i in_bulk na tej samej bazie - inaczej identyfikatory z repliki moglyby nie
+        # pasowac do wierszy z bazy glownej (lub odwrotnie)
+        self.db = queryset.db
+        self.queryset = queryset.using(self.db)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def _ids(self, limit, offset):
+        if not self.match:
+            return []
+        weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s",
+                [self.match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - offset, 0)
+        ids = self._ids(limit, offset)
+        teas = self.queryset.in_bulk(ids)
+        return [teas[pk] for pk in ids if pk in teas]
+
+    def __iter__(self):
+        return iter(self[:])
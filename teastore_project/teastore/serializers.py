@@ -1,58 +1,98 @@
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.utils import timezone
 from rest_framework import serializers
 
+from .accounts import build_user
+from .metrics import render_timer
 from .models import TeaCategory, Origin, Tea, Order, OrderItem
 
 
-class TeaCategorySerializer(serializers.ModelSerializer):
+def validate_delivery_date(value):
+    if value and value < timezone.localdate():
+        raise serializers.ValidationError("Data dostawy nie moze byc z przeszlosci.")
+    return value
+
+
+# Reguly walidacji wydzielone z serializerow - korzysta z nich tez import katalogu
+def validate_country_code(value):
+    if len(value) != 2 or not value.isalpha() or not value.isupper():
+        raise serializers.ValidationError(
+            "Kod kraju musi skladac sie z 2 wielkich liter, np. PL."
+        )
+    return value
+
+
+def validate_tea_name(value):
+    if not value:
+        raise serializers.ValidationError("Nazwa herbaty jest wymagana.")
+    first_char = value[0]
+    if not first_char.isupper():
+        raise serializers.ValidationError(
+            "Nazwa herbaty powinna zaczynac sie wielka litera."
+        )
+    return value
+
+
+def validate_tea_values(data):
+    price = data.get("price")
+    stock_qty = data.get("stock_qty")
+
+    if price is not None and price <= 0:
+        raise serializers.ValidationError({"price": "Cena musi byc wieksza od 0."})
+    if stock_qty is not None and stock_qty < 0:
+        raise serializers.ValidationError(
+            {"stock_qty": "Stan magazynowy nie moze byc ujemny."}
+        )
+    return data
+
+
+class RenderTimingMixin:
+    # Czas serializacji liczony do metryki renderowania; zapytania z listy nie wchodza
+    # w pomiar, bo queryset jest odczytywany przed pierwszym to_representation
+    def to_representation(self, instance):
+        with render_timer():
+            return super().to_representation(instance)
+
+
+class SparseFieldsMixin(RenderTimingMixin):
+    # fields=[...] ogranicza reprezentacje do wybranych pol (parametr ?fields=)
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TeaCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TeaCategory
         fields = "__all__"
 
 
-class OriginSerializer(serializers.ModelSerializer):
+class OriginSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Origin
         fields = "__all__"
 
     def validate_country_code(self, value):
-        if len(value) != 2 or not value.isalpha() or not value.isupper():
-            raise serializers.ValidationError(
-                "Kod kraju musi skladac sie z 2 wielkich liter, np. PL."
-            )
-        return value
+        return validate_country_code(value)
 
 
-class TeaSerializer(serializers.ModelSerializer):
+class TeaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tea
         fields = "__all__"
         read_only_fields = ["added_at"]
 
     def validate_name(self, value):
-        if not value:
-            raise serializers.ValidationError("Nazwa herbaty jest wymagana.")
-        first_char = value[0]
-        if not first_char.isupper():
-            raise serializers.ValidationError(
-                "Nazwa herbaty powinna zaczynac sie wielka litera."
-            )
-        return value
+        return validate_tea_name(value)
 
     def validate(self, data):
-        price = data.get("price")
-        stock_qty = data.get("stock_qty")
-
-        if price is not None and price <= 0:
-            raise serializers.ValidationError({"price": "Cena musi byc wieksza od 0."})
-        if stock_qty is not None and stock_qty < 0:
-            raise serializers.ValidationError(
-                {"stock_qty": "Stan magazynowy nie moze byc ujemny."}
-            )
-        return data
+        return validate_tea_values(data)
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = "__all__"
@@ -72,7 +112,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return data
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -81,11 +121,28 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "user"]
 
     def validate_delivery_date(self, value):
-        from django.utils import timezone
+        return validate_delivery_date(value)
+
+
+class CheckoutLineSerializer(serializers.Serializer):
+    # Zwykle id zamiast PrimaryKeyRelatedField - herbaty pobieramy jednym zapytaniem
+    tea = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    delivery_date = serializers.DateField(required=False, allow_null=True)
+    note = serializers.CharField(required=False, allow_blank=True)
+    items = CheckoutLineSerializer(many=True, allow_empty=False)
+
+    def validate_delivery_date(self, value):
+        return validate_delivery_date(value)
 
-        if value and value < timezone.localdate():
-            raise serializers.ValidationError("Data dostawy nie moze byc z przeszlosci.")
-        return value
+    def validate_items(self, items):
+        tea_ids = [line["tea"] for line in items]
+        if len(set(tea_ids)) != len(tea_ids):
+            raise serializers.ValidationError("Kazda herbata moze wystapic w zamowieniu tylko raz.")
+        return items
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -96,4 +153,15 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ["username", "password", "email", "first_name", "last_name"]
 
     def create(self, validated_data):
-        return User.objects.create_user(**validated_data)
+        user = build_user(validated_data)
+        user.save()
+        return user
+
+
+class BulkUserRegistrationSerializer(serializers.Serializer):
+    # Bez UniqueValidator - unikalnosc loginow sprawdzamy jednym zapytaniem dla calej paczki
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    password = serializers.CharField(write_only=True, required=False)
+    email = serializers.EmailField(required=False, allow_blank=True)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
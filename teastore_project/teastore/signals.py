@@ -0,0 +1,110 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .accounts import forget_user_group
+from .authentication import invalidate_user_tokens
+from .cache import bump_catalog_version, bump_fragment_versions
+from .middleware import install_sql_recorder
+from .models import TeaCategory, Origin, Tea, Order, OrderItem
+from .permissions import bump_permission_version, invalidate_user_permissions
+from .totals import adjust_order_totals, rebuild_order_totals
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_sql_recorder(connection)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate_user_permissions([instance.pk])
+    elif pk_set and model is User:
+        invalidate_user_permissions(pk_set)
+    else:
+        bump_permission_version()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_permission_version()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def permission_source_deleted(sender, **kwargs):
+    bump_permission_version()
+
+
+@receiver(post_delete, sender=Group)
+def user_group_deleted(sender, **kwargs):
+    forget_user_group()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Zapamietane tokeny niosa kopie uzytkownika (is_active, is_staff) - wymuszamy odczyt z bazy
+    invalidate_user_tokens([instance.pk])
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_user_tokens([instance.user_id])
+
+
+@receiver(post_save, sender=Tea)
+@receiver(post_delete, sender=Tea)
+@receiver(post_save, sender=TeaCategory)
+@receiver(post_delete, sender=TeaCategory)
+@receiver(post_save, sender=Origin)
+@receiver(post_delete, sender=Origin)
+def catalog_changed(sender, **kwargs):
+    # Po zatwierdzeniu - inaczej rownolegly GET zapisalby stare wiersze pod nowa wersja
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Tea)
+@receiver(post_delete, sender=Tea)
+@receiver(post_save, sender=TeaCategory)
+@receiver(post_delete, sender=TeaCategory)
+def catalog_card_changed(sender, instance, **kwargs):
+    # Po zatwierdzeniu, tak jak wersja katalogu; pk zapamietane, bo delete() je zeruje
+    pk = instance.pk
+    transaction.on_commit(lambda: bump_fragment_versions(sender, [pk]))
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, created, **kwargs):
+    line_total = instance.unit_price * instance.quantity
+    previous = None if created else getattr(instance, "_loaded_line", None)
+    if previous is None and not created:
+        # Obiekt nie pochodzi z from_db (np. zbudowany recznie z pk) - liczymy od nowa
+        rebuild_order_totals(Order.objects.filter(pk=instance.order_id))
+    elif previous is None:
+        adjust_order_totals(instance.order_id, line_total, 1)
+    elif previous[0] == instance.order_id:
+        adjust_order_totals(instance.order_id, line_total - previous[1], 0)
+    else:
+        adjust_order_totals(previous[0], -previous[1], -1)
+        adjust_order_totals(instance.order_id, line_total, 1)
+    instance._loaded_line = (instance.order_id, line_total)
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Order) or getattr(origin, "model", None) is Order:
+        # Pozycje usuwane kaskadowo razem z zamowieniem
+        return
+    previous = getattr(instance, "_loaded_line", None)
+    if previous is None:
+        previous = (instance.order_id, instance.unit_price * instance.quantity)
+    adjust_order_totals(previous[0], -previous[1], -1)
@@ -0,0 +1,111 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .cache import bump_catalog_version, bump_fragment_versions
+from .models import Tea, OrderStatus
+
+
+class InsufficientStock(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Niewystarczajacy stan magazynowy."
+    default_code = "insufficient_stock"
+
+    def __init__(self, shortfalls):
+        super().__init__()
+        self.shortfalls = shortfalls
+        # Bez _get_error_details, ktore zamienia liczby na napisy
+        self.detail = {"detail": self.default_detail, "shortfalls": shortfalls}
+
+
+def _merge_lines(lines):
+    quantities = defaultdict(int)
+    for tea_id, quantity in lines:
+        quantities[tea_id] += quantity
+    # Stala kolejnosc blokowania wierszy - bez zakleszczen miedzy rownoleglymi zamowieniami
+    return sorted((tea_id, quantity) for tea_id, quantity in quantities.items() if quantity > 0)
+
+
+def _stock_changed(lines):
+    tea_ids = [tea_id for tea_id, _ in lines]
+
+    def bump():
+        # UPDATE ... F() pomija sygnaly - uniewazniamy katalog i karty herbat recznie
+        bump_catalog_version()
+        bump_fragment_versions(Tea, tea_ids)
+
+    transaction.on_commit(bump)
+
+
+# Zdejmuje ze stanu wszystkie linie (tea_id, quantity) albo zadna, gdy ktorejs brakuje
+def reserve_stock(lines):
+    lines = _merge_lines(lines)
+    shortfalls = []
+    with transaction.atomic():
+        for tea_id, quantity in lines:
+            # Jeden warunkowy UPDATE - sprawdzenie i zdjecie stanu sa atomowe
+            reserved = Tea.objects.filter(pk=tea_id, stock_qty__gte=quantity).update(
+                stock_qty=F("stock_qty") - quantity
+            )
+            if not reserved:
+                shortfalls.append((tea_id, quantity))
+        if shortfalls:
+            available = dict(
+                Tea.objects.filter(pk__in=[tea_id for tea_id, _ in shortfalls]).values_list(
+                    "pk", "stock_qty"
+                )
+            )
+            raise InsufficientStock(
+                [
+                    {"tea": tea_id, "requested": quantity, "available": available.get(tea_id, 0)}
+                    for tea_id, quantity in shortfalls
+                ]
+            )
+        if lines:
+            _stock_changed(lines)
+
+
+# Podglad bez blokad dla formularzy - ostatecznie decyduje warunkowy UPDATE w reserve_stock
+def stock_shortfalls(lines):
+    lines = _merge_lines(lines)
+    available = dict(
+        Tea.objects.filter(pk__in=[tea_id for tea_id, _ in lines]).values_list("pk", "stock_qty")
+    )
+    return [
+        {"tea": tea_id, "requested": quantity, "available": available.get(tea_id, 0)}
+        for tea_id, quantity in lines
+        if available.get(tea_id, 0) < quantity
+    ]
+
+
+def release_stock(lines):
+    lines = _merge_lines(lines)
+    with transaction.atomic():
+        for tea_id, quantity in lines:
+            Tea.objects.filter(pk=tea_id).update(stock_qty=F("stock_qty") + quantity)
+        if lines:
+            _stock_changed(lines)
+
+
+# Rezerwacje, ktore mozna jeszcze zwolnic - wyslany towar opuscil juz magazyn
+RESERVING_STATUSES = (OrderStatus.NEW, OrderStatus.PAID)
+
+
+def holds_stock(order):
+    return order.status in RESERVING_STATUSES
+
+
+def order_lines(order):
+    return list(order.items.values_list("tea_id", "quantity"))
+
+
+def apply_status_change(order, previous_status):
+    # Stan wraca tylko przy anulowaniu niewyslanego zamowienia, a przywrocenie anulowanego
+    # (takze od razu jako wyslane) zdejmuje go ponownie
+    if previous_status in RESERVING_STATUSES and order.status == OrderStatus.CANCELED:
+        release_stock(order_lines(order))
+    elif previous_status == OrderStatus.CANCELED and order.status != OrderStatus.CANCELED:
+        reserve_stock(order_lines(order))
@@ -0,0 +1,62 @@
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = getattr(settings, "TEASTORE_STREAM_CHUNK_SIZE", 2000)
+
+
+def wants_stream(request):
+    return request.query_params.get("stream") in ("1", "true")
+
+
+def _encode(item):
+    # Ten sam format co JSONRenderer DRF (zwarty, bez ucieczek unicode)
+    return json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_json_array(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    rows = queryset.iterator(chunk_size=chunk_size)
+    separator = ""
+    yield "["
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        data = serializer_class(chunk, many=True).data
+        yield separator + ",".join(_encode(item) for item in data)
+        separator = ","
+    yield "]"
+
+
+async def _aiter_in_thread(iterator, batch):
+    # Generator z zapytaniami ORM wykonywany w watku sync_to_async, po `batch` elementow
+    # na jedno przejscie - petla zdarzen nie blokuje sie na bazie
+    take = sync_to_async(lambda: list(islice(iterator, batch)))
+    while True:
+        items = await take()
+        if not items:
+            return
+        yield "".join(items)
+
+
+def streaming_body(request, iterator, batch=1):
+    # Pod ASGI Django wczytalby synchroniczny iterator w calosci do pamieci, wiec
+    # dostaje wersje async; pod WSGI strumieniujemy zwykly generator
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return _aiter_in_thread(iterator, batch)
+    return iterator
+
+
+def streaming_json_response(request, queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    # W pamieci jest naraz tylko jedna paczka wierszy, niezaleznie od rozmiaru tabeli
+    return StreamingHttpResponse(
+        streaming_body(
+            request, iter_json_array(queryset.order_by("pk"), serializer_class, chunk_size)
+        ),
+        content_type="application/json",
+    )
@@ -0,0 +1,18 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .metrics import render_timer
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with render_timer():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    # Czas renderowania szablonow (takze z render() w widokach HTML) trafia do metryk
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
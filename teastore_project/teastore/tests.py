@@ -1,3 +1,1662 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import json
+import re
+import threading
+import time
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from .accounts import USER_GROUP_NAME, ensure_user_group, register_user_accounts_bulk
+from .authentication import (
+    acached_token,
+    aremember_token,
+    clear_token_cache,
+    invalidate_user_tokens,
+)
+from .cache import catalog_response, catalog_version, fragment_versions
+from .catalog_import import MAX_REPORTED_ERRORS, CatalogImporter
+from .export import EXPORT_COLUMNS, iter_export_rows
+from .management.commands.cleanup_sessions import delete_expired_sessions
+from .metrics import registry, render_timer, stop_tracking_render, track_render
+from .middleware import ReplicaRoutingMiddleware
+from .models import TeaCategory, Origin, Tea, Order, OrderItem, OrderStatus
+from .permissions import user_has_perm
+from .routers import PIN_COOKIE, ReplicaRouter, reset_replica, use_replica
+from .search import TeaSearchResults, search_available
+from .serializers import OrderSerializer
+from .stock import InsufficientStock, reserve_stock
+from .streaming import iter_json_array
+from .throttling import TokenBucket
+from .totals import rebuild_order_totals
+
+# Wiersz planu "SCAN tabela" (bez "VIRTUAL TABLE INDEX" - to wyszukiwanie w indeksie FTS5)
+FULL_SCAN = re.compile(r"\bSCAN (teastore_\w+)\b(?! VIRTUAL TABLE INDEX)")
+
+
+@skipUnless(connection.vendor == "sqlite", "Plany zapytan sprawdzamy na SQLite.")
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Zielone")
+        origin = Origin.objects.create(country_code="JP", region="Uji", is_organic=True)
+        cls.category = category
+        cls.teas = [
+            Tea.objects.create(
+                name=f"Sencha {i}",
+                category=category,
+                origin=origin,
+                tea_type="green",
+                caffeine_level="medium",
+                price=Decimal("10.00") + i,
+                stock_qty=100,
+            )
+            for i in range(3)
+        ]
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+        for _ in range(2):
+            order = Order.objects.create(user=cls.user)
+            OrderItem.objects.create(order=order, tea=cls.teas[0], quantity=1, unit_price=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNoFullScan(self, path, params=None, sorted_by_index=False):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params or {})
+        self.assertEqual(response.status_code, 200)
+
+        selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        for sql in selects:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = "\n".join(row[-1] for row in cursor.fetchall())
+            self.assertIsNone(
+                FULL_SCAN.search(plan), f"Pelny skan tabeli w {path}:\n{sql}\n{plan}"
+            )
+            if sorted_by_index:
+                self.assertNotIn("TEMP B-TREE FOR", plan, f"Sortowanie poza indeksem:\n{sql}")
+
+    def test_order_list(self):
+        self.assertNoFullScan("/api/orders/")
+
+    def test_order_list_paginated(self):
+        # Paginacja kursorowa po (-created_at, -id) czyta indeks wstecz, bez sortowania
+        self.assertNoFullScan("/api/orders/", {"page_size": 10}, sorted_by_index=True)
+
+    def test_orders_my(self):
+        self.assertNoFullScan("/api/orders/my/")
+
+    def test_order_item_list(self):
+        self.assertNoFullScan("/api/order-items/")
+
+    def test_order_item_list_paginated(self):
+        self.assertNoFullScan("/api/order-items/", {"page_size": 10})
+
+    def test_tea_list_by_category(self):
+        self.assertNoFullScan("/api/teas/", {"is_active": "true", "category": self.category.pk})
+
+    def test_tea_list_by_price(self):
+        self.assertNoFullScan("/api/teas/", {"price_min": "10", "price_max": "11"})
+
+    def test_tea_list_active_with_facets(self):
+        self.assertNoFullScan(
+            "/api/teas/", {"is_active": "true", "price_max": "20", "facets": "1"}
+        )
+
+    def test_teas_search(self):
+        if not search_available():
+            self.skipTest("Brak indeksu FTS5.")
+        self.assertNoFullScan("/api/teas/search/", {"name": "sencha"})
+
+    def test_teas_search_paginated(self):
+        if not search_available():
+            self.skipTest("Brak indeksu FTS5.")
+        self.assertNoFullScan("/api/teas/search/", {"name": "sencha", "page_size": 2})
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        seen = {}
+
+        def view(request):
+            seen["before"] = self.router.db_for_read(Tea)
+            seen["user"] = self.router.db_for_read(User)
+            if write:
+                self.router.db_for_write(Order)
+            seen["after"] = self.router.db_for_read(Tea)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_get_reads_catalog_from_replica(self):
+        seen, response = self.route(self.factory.get("/api/teas/"))
+        self.assertEqual(seen, {"before": "replica", "user": "default", "after": "replica"})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_after_write_use_primary(self):
+        seen, _ = self.route(self.factory.get("/api/teas/"), write=True)
+        self.assertEqual(seen["after"], "default")
+
+    def test_post_pins_client_to_primary(self):
+        seen, response = self.route(self.factory.post("/api/html/orders/dodaj/"))
+        self.assertEqual(seen["before"], "default")
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get("/api/html/orders/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        seen, _ = self.route(request)
+        self.assertEqual(seen["before"], "default")
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Tea), "default")
+
+
+    def test_catalog_cache_is_filled_from_primary(self):
+        cache.clear()
+        seen = []
+
+        def build():
+            seen.append(self.router.db_for_read(Tea))
+            return Response([])
+
+        token = use_replica(True)
+        try:
+            catalog_response(self.factory.get("/api/teas/"), build)
+            seen.append(self.router.db_for_read(Tea))
+        finally:
+            reset_replica(token)
+        self.assertEqual(seen, ["default", "replica"])
+
+    @override_settings(DATABASE_ROUTERS=["teastore.routers.ReplicaRouter"])
+    def test_search_runs_on_one_database(self):
+        token = use_replica(True)
+        try:
+            results = TeaSearchResults("sencha")
+        finally:
+            reset_replica(token)
+        self.assertEqual((results.db, results.queryset.db), ("replica", "replica"))
+
+class HtmlTeaListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = TeaCategory.objects.create(name="Czarne")
+        Tea.objects.bulk_create(
+            Tea(
+                name=f"Assam {i}",
+                category=cls.category,
+                tea_type="black",
+                caffeine_level="high",
+                price=Decimal("12.00"),
+                stock_qty=10,
+            )
+            for i in range(120)
+        )
+        cls.user = User.objects.create_user("klient", password="x")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_query_count_does_not_grow_with_page(self):
+        self.client.get("/api/html/teas/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/html/teas/", {"page": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"]), 50)
+        # sesja, uzytkownik, COUNT i jedna strona herbat z kategoria
+        self.assertLessEqual(len(queries), 4)
+
+    def test_card_refreshed_after_tea_and_category_change(self):
+        tea = Tea.objects.order_by("id").first()
+        self.client.get("/api/html/teas/")
+
+        tea.price = Decimal("99.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            tea.save()
+        self.assertContains(self.client.get("/api/html/teas/"), "99.00")
+
+        self.category.name = "Czarne lisciaste"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertContains(self.client.get("/api/html/teas/"), "Czarne lisciaste", count=50)
+
+    def test_card_versions_do_not_evict_catalog_version(self):
+        version = catalog_version()
+        fragment_versions(Tea, range(1, 1001))
+        self.assertEqual(catalog_version(), version)
+
+
+class HtmlOrderListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Czarne")
+        tea = Tea.objects.create(
+            name="Assam",
+            category=category,
+            tea_type="black",
+            caffeine_level="high",
+            price=Decimal("12.00"),
+            stock_qty=10,
+        )
+        cls.staff = User.objects.create_user("obsluga", password="x", is_staff=True)
+        cls.users = [User.objects.create_user(f"klient{i}", password="x") for i in range(3)]
+        for i in range(60):
+            status = OrderStatus.PAID if i % 2 else OrderStatus.NEW
+            order = Order.objects.create(user=cls.users[i % 3], status=status)
+            OrderItem.objects.create(order=order, tea=tea, quantity=1, unit_price=tea.price)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def get(self, path, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params or {})
+        self.assertEqual(response.status_code, 200)
+        # sesja, uzytkownik, COUNT i jedna strona z powiazanymi obiektami
+        self.assertLessEqual(len(queries), 4)
+        return response
+
+    def test_order_list_is_paginated(self):
+        page = self.get("/api/html/orders/").context["page_obj"]
+        self.assertEqual((len(page), page.paginator.count), (50, 60))
+
+    def test_order_list_filters(self):
+        today = timezone.localdate().isoformat()
+        page = self.get(
+            "/api/html/orders/", {"status": "paid", "created_from": today, "created_to": today}
+        ).context["page_obj"]
+        self.assertEqual(page.paginator.count, 30)
+        self.assertTrue(all(order.status == OrderStatus.PAID for order in page))
+
+        page = self.get("/api/html/orders/", {"created_to": "2000-01-01"}).context["page_obj"]
+        self.assertEqual(page.paginator.count, 0)
+
+    def test_order_item_list_filters_by_order(self):
+        page = self.get("/api/html/order-items/", {"status": "new", "page": 2}).context["page_obj"]
+        self.assertEqual(page.paginator.count, 30)
+
+    def test_customer_sees_only_own_orders(self):
+        self.client.force_login(self.users[0])
+        page = self.get("/api/html/orders/").context["page_obj"]
+        self.assertEqual(page.paginator.count, 20)
+
+    def test_order_detail(self):
+        self.get(f"/api/html/orders/{Order.objects.first().pk}/")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+
+    def setUp(self):
+        cache.clear()
+        clear_token_cache()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeated_requests_skip_token_query(self):
+        self.assertEqual(self.client.get("/api/orders/my/").status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get("/api/orders/my/").status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if "authtoken" in q["sql"]])
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get("/api/orders/my/")
+        self.token.delete()
+        # SessionAuthentication jest pierwsza na liscie, wiec DRF odpowiada 403 zamiast 401
+        self.assertEqual(self.client.get("/api/orders/my/").status_code, 403)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get("/api/orders/my/")
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/orders/my/").status_code, 403)
+
+    def test_async_views_share_cache(self):
+        self.client.get("/api/orders/my/")
+        self.token.delete()
+        self.assertEqual(self.client.get("/api/async/orders/my/").status_code, 401)
+
+    async def test_async_lookup_honours_invalidation(self):
+        token = await Token.objects.select_related("user").aget(pk=self.token.pk)
+        await aremember_token(token)
+        self.assertEqual((await acached_token(token.key)).user, self.user)
+        invalidate_user_tokens([self.user.pk])
+        self.assertIsNone(await acached_token(token.key))
+
+
+class CleanupSessionsTests(TestCase):
+    def test_deletes_only_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f"sesja{i}",
+                session_data="",
+                expire_date=now + datetime.timedelta(days=1 if i < 2 else -1),
+            )
+            for i in range(7)
+        )
+        self.assertEqual(delete_expired_sessions(batch_size=2), 5)
+        self.assertEqual(set(Session.objects.values_list("pk", flat=True)), {"sesja0", "sesja1"})
+
+
+class AuthThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("klient", password="haslo-klienta")
+
+    def setUp(self):
+        cache.clear()
+        # Zatrzymany zegar kubelkow - wolne haszowanie hasel nie odnawia tokenow w trakcie testu
+        clock = mock.patch("teastore.throttling.time.time", return_value=1_000_000.0)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_login_flood_is_rejected_before_password_check(self):
+        with mock.patch("teastore.views.authenticate", return_value=None) as authenticate:
+            responses = [
+                self.client.post("/api/login/", {"username": "klient", "password": "zle"})
+                for _ in range(8)
+            ]
+        self.assertEqual([r.status_code for r in responses], [200] * 5 + [429] * 3)
+        self.assertEqual(authenticate.call_count, 5)
+        self.assertGreater(int(responses[-1]["Retry-After"]), 0)
+
+    def test_ip_limit_covers_many_usernames(self):
+        codes = [
+            self.client.post(
+                "/api/auth/register/", {"username": f"nowy{i}", "password": "x"}
+            ).status_code
+            for i in range(22)
+        ]
+        self.assertEqual(codes.count(429), 2)
+
+    def test_api_token_auth_is_throttled(self):
+        client = APIClient()
+        for _ in range(5):
+            response = client.post(
+                "/api-token-auth/", {"username": "klient", "password": "haslo-klienta"}
+            )
+            self.assertEqual(response.status_code, 200)
+        response = client.post(
+            "/api-token-auth/", {"username": "KLIENT", "password": "haslo-klienta"}
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_basic_auth_header_does_not_skip_limits(self):
+        # Wczesniej BasicAuthentication sprawdzalo haslo z naglowka i odpowiadalo 401 przed limitem
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"klient:zle").decode())
+        codes = [
+            client.post("/api-token-auth/", {"username": "klient", "password": "zle"}).status_code
+            for _ in range(6)
+        ]
+        self.assertEqual(codes, [400] * 5 + [429])
+        response = client.post("/api/auth/register/", {"username": "klient", "password": "x"})
+        self.assertEqual(response.status_code, 429)
+
+    def test_forwarded_for_header_is_not_trusted(self):
+        with mock.patch("teastore.views.authenticate", return_value=None):
+            codes = [
+                self.client.post(
+                    "/api/login/",
+                    {"username": f"nowy{i}", "password": "zle"},
+                    HTTP_X_FORWARDED_FOR=f"10.0.0.{i}",
+                ).status_code
+                for i in range(22)
+            ]
+        self.assertEqual(codes.count(429), 2)
+
+    def test_parallel_takes_do_not_share_a_token(self):
+        bucket = TokenBucket("test", 5, 1)
+        barrier = threading.Barrier(8)
+        results = []
+        get = LocMemCache.get
+
+        def slow_get(cache, *args, **kwargs):
+            # Poszerza okno miedzy odczytem a zapisem kubelka
+            value = get(cache, *args, **kwargs)
+            time.sleep(0.002)
+            return value
+
+        def take():
+            barrier.wait()
+            results.append(bucket.take("10.0.0.1"))
+
+        with mock.patch.object(LocMemCache, "get", slow_get):
+            threads = [threading.Thread(target=take) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(0), 5)
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Zielone")
+        cls.tea = Tea.objects.create(
+            name="Sencha",
+            description="Dlugi opis " * 50,
+            category=category,
+            tea_type="green",
+            caffeine_level="medium",
+            price=Decimal("10.00"),
+            stock_qty=5,
+        )
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+        order = Order.objects.create(user=cls.user, note="Notatka")
+        OrderItem.objects.create(order=order, tea=cls.tea, quantity=1, unit_price=cls.tea.price)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, {"fields": fields})
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [q["sql"] for q in queries.captured_queries]
+
+    def test_tea_list_selects_only_requested_columns(self):
+        data, queries = self.get("/api/teas/", "id,name,price")
+        self.assertEqual(data, [{"id": self.tea.pk, "name": "Sencha", "price": "10.00"}])
+        self.assertNotIn('"description"', queries[-1])
+
+    def test_tea_detail(self):
+        data, _ = self.get(f"/api/teas/{self.tea.pk}/", "name")
+        self.assertEqual(data, {"name": "Sencha"})
+
+    def test_order_list_without_items_skips_prefetch(self):
+        data, queries = self.get("/api/orders/", "id,status")
+        self.assertEqual(list(data[0]), ["id", "status"])
+        queries = [sql for sql in queries if "teastore_order" in sql]
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"note"', queries[0])
+
+    def test_order_item_list(self):
+        data, _ = self.get("/api/order-items/", "tea,quantity")
+        self.assertEqual(data, [{"tea": self.tea.pk, "quantity": 1}])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/teas/", {"fields": "id,kolor"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("kolor", response.json()["fields"][0])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Czarne")
+        cls.teas = [
+            Tea.objects.create(
+                name=f"Assam {i}",
+                category=category,
+                tea_type="black",
+                caffeine_level="high",
+                price=Decimal("12.00"),
+                stock_qty=10,
+            )
+            for i in range(7)
+        ]
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+        created = timezone.now()
+        cls.orders = [Order.objects.create(user=cls.user) for _ in range(5)]
+        # Dwa zamowienia z ta sama data - kolejnosc rozstrzyga id
+        for order, minutes in zip(cls.orders, (5, 1, 3, 3, 4)):
+            Order.objects.filter(pk=order.pk).update(
+                created_at=created - datetime.timedelta(minutes=minutes)
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, path, page_size):
+        pages = []
+        url = f"{path}?page_size={page_size}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["id"] for row in response.data["results"]])
+            url = response.data["next"]
+        return pages
+
+    def test_tea_pages_cover_catalog_once(self):
+        pages = self.walk("/api/teas/", 3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), [tea.pk for tea in self.teas])
+
+    def test_order_pages_newest_first_with_id_tiebreak(self):
+        expected = list(Order.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        self.assertEqual(sum(self.walk("/api/orders/", 2), []), expected)
+        self.assertEqual(expected[1:3], sorted(expected[1:3], reverse=True))
+
+    def test_previous_link_returns_to_first_page(self):
+        first = self.client.get("/api/teas/", {"page_size": 3})
+        self.assertIsNone(first.data["previous"])
+        back = self.client.get(self.client.get(first.data["next"]).data["previous"])
+        self.assertEqual([row["id"] for row in back.data["results"]], [t.pk for t in self.teas[:3]])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get("/api/teas/", {"cursor": "zepsuty"}).status_code, 404)
+
+    def test_list_without_pagination_params_is_plain_array(self):
+        self.assertEqual(len(self.client.get("/api/teas/").data), 7)
+
+
+class OrderPrefetchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Czarne")
+        cls.teas = [
+            Tea.objects.create(
+                name=f"Assam {i}",
+                category=category,
+                tea_type="black",
+                caffeine_level="high",
+                price=Decimal("12.00"),
+                stock_qty=10,
+            )
+            for i in range(3)
+        ]
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(user=self.user)
+            for tea in self.teas:
+                OrderItem.objects.create(order=order, tea=tea, quantity=1, unit_price=tea.price)
+
+    def assertConstantQueries(self, path, expected):
+        self.client.get(path)
+        for count in (1, 10):
+            self.add_orders(count)
+            with self.assertNumQueries(expected):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_order_list(self):
+        response = self.assertConstantQueries("/api/orders/", 2)
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(len(response.data[0]["items"]), 3)
+
+    def test_orders_my(self):
+        self.assertConstantQueries("/api/orders/my/", 2)
+
+    def test_order_detail(self):
+        self.add_orders(1)
+        path = f"/api/orders/{Order.objects.get().pk}/"
+        self.client.get(path)
+        # zamowienie, pozycje, wlasciciel (kontrola dostepu)
+        with self.assertNumQueries(3):
+            response = self.client.get(path)
+        self.assertEqual(len(response.data["items"]), 3)
+
+
+class PermissionCacheTests(TestCase):
+    perm = "teastore.view_tea"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = ensure_user_group()
+        cls.user_id = User.objects.create_user("klient", password="x").pk
+        cls.permission = Permission.objects.get(codename="view_tea")
+
+    def setUp(self):
+        cache.clear()
+
+    def has_perm(self):
+        # Swiezy obiekt jak w kazdym zadaniu - bez _perm_cache z ModelBackend
+        return user_has_perm(User.objects.get(pk=self.user_id), self.perm)
+
+    def test_group_membership_change(self):
+        user = User.objects.get(pk=self.user_id)
+        self.assertFalse(self.has_perm())
+        user.groups.add(self.group)
+        self.assertTrue(self.has_perm())
+        user.groups.remove(self.group)
+        self.assertFalse(self.has_perm())
+        self.group.user_set.add(user)
+        self.assertTrue(self.has_perm())
+        self.group.user_set.clear()
+        self.assertFalse(self.has_perm())
+
+    def test_group_permission_change(self):
+        User.objects.get(pk=self.user_id).groups.add(self.group)
+        self.assertTrue(self.has_perm())
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.has_perm())
+        self.permission.group_set.add(self.group)
+        self.assertTrue(self.has_perm())
+
+    def test_direct_user_permission_change(self):
+        user = User.objects.get(pk=self.user_id)
+        self.assertFalse(self.has_perm())
+        user.user_permissions.add(self.permission)
+        self.assertTrue(self.has_perm())
+        self.permission.user_set.remove(user)
+        self.assertFalse(self.has_perm())
+
+    def test_group_deleted(self):
+        User.objects.get(pk=self.user_id).groups.add(self.group)
+        self.assertTrue(self.has_perm())
+        self.group.delete()
+        self.assertFalse(self.has_perm())
+
+    def test_inactive_user_has_no_permissions(self):
+        User.objects.get(pk=self.user_id).groups.add(self.group)
+        User.objects.filter(pk=self.user_id).update(is_active=False)
+        self.assertFalse(self.has_perm())
+
+
+class BulkRegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("obsluga", password="x", is_staff=True)
+        User.objects.create_user("zajety", password="x")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def post(self, rows):
+        return self.client.post("/api/auth/register/bulk/", rows, format="json")
+
+    def test_group_is_provisioned_by_migrate(self):
+        group = Group.objects.get(name=USER_GROUP_NAME)
+        self.assertTrue(group.permissions.filter(codename="view_tea").exists())
+        self.assertTrue(group.permissions.filter(codename="add_order").exists())
+
+    def test_creates_users_tokens_and_group_membership(self):
+        response = self.post(
+            [{"username": "anna", "password": "tajne-haslo-1"}, {"username": "bartek"}]
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row["username"] for row in response.data], ["anna", "bartek"])
+        anna = User.objects.get(username="anna")
+        self.assertTrue(anna.check_password("tajne-haslo-1"))
+        self.assertFalse(User.objects.get(username="bartek").has_usable_password())
+        self.assertEqual(Token.objects.get(user=anna).key, response.data[0]["token"])
+        self.assertTrue(user_has_perm(anna, "teastore.view_tea"))
+
+    def test_taken_and_duplicate_usernames_are_rejected(self):
+        response = self.post([{"username": "zajety"}, {"username": "ola"}, {"username": "ola"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {0, 2})
+        self.assertFalse(User.objects.filter(username="ola").exists())
+
+    def test_usernames_equal_after_normalization_are_rejected(self):
+        # "ﬁ" (ligatura fi) po normalizacji NFKC to "fi"
+        response = self.post([{"username": "ﬁlip"}, {"username": "filip"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {1})
+
+    def test_single_registration_hashes_outside_transaction(self):
+        depths = {}
+        set_password, save = User.set_password, User.save
+
+        def recording_set_password(user, raw_password):
+            depths["hash"] = len(connection.atomic_blocks)
+            set_password(user, raw_password)
+
+        def recording_save(user, *args, **kwargs):
+            depths["save"] = len(connection.atomic_blocks)
+            save(user, *args, **kwargs)
+
+        with (
+            mock.patch.object(User, "set_password", recording_set_password),
+            mock.patch.object(User, "save", recording_save),
+        ):
+            response = APIClient().post(
+                "/api/auth/register/", {"username": "dorota", "password": "tajne-haslo-3"}
+            )
+        self.assertEqual(response.status_code, 201)
+        # Test sam dziala w transakcji, wiec porownujemy glebokosc zagniezdzenia
+        self.assertLess(depths["hash"], depths["save"])
+        dorota = User.objects.get(username="dorota")
+        self.assertTrue(dorota.check_password("tajne-haslo-3"))
+        self.assertEqual(Token.objects.get(user=dorota).key, response.data["token"])
+
+    def test_caller_rows_are_not_modified(self):
+        rows = [{"username": "celina", "password": "tajne-haslo-2"}]
+        register_user_accounts_bulk(rows)
+        self.assertEqual(rows, [{"username": "celina", "password": "tajne-haslo-2"}])
+
+
+class TeaSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = TeaCategory.objects.create(name="Zielone")
+        cls.origin = Origin.objects.create(country_code="JP", region="Uji")
+        cls.gyokuro = cls.create_tea("Gyokuro Premium")
+        cls.sencha = cls.create_tea("Sencha", description="Lzejsza od gyokuro.")
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+
+    @classmethod
+    def create_tea(cls, name, description=""):
+        return Tea.objects.create(
+            name=name,
+            description=description,
+            category=cls.category,
+            origin=cls.origin,
+            tea_type="green",
+            caffeine_level="medium",
+            price=Decimal("20.00"),
+        )
+
+    def setUp(self):
+        if not search_available():
+            self.skipTest("Brak indeksu FTS5.")
+
+    def search(self, text):
+        return [tea.pk for tea in TeaSearchResults(text)]
+
+    def test_prefix_match(self):
+        self.assertEqual(self.search("senc"), [self.sencha.pk])
+
+    def test_name_match_ranks_above_description(self):
+        self.assertEqual(self.search("gyokuro"), [self.gyokuro.pk, self.sencha.pk])
+
+    def test_insert_update_delete_keep_index_in_sync(self):
+        tea = self.create_tea("Matcha")
+        self.assertEqual(self.search("matcha"), [tea.pk])
+        tea.name = "Hojicha"
+        tea.save()
+        self.assertEqual(self.search("matcha"), [])
+        self.assertEqual(self.search("hojicha"), [tea.pk])
+        tea.delete()
+        self.assertEqual(self.search("hojicha"), [])
+
+    def test_category_and_origin_rename(self):
+        self.category.name = "Japonskie"
+        self.category.save()
+        self.assertEqual(len(self.search("japonskie")), 2)
+        self.origin.region = "Kagoshima"
+        self.origin.save()
+        self.assertEqual(len(self.search("kagoshima")), 2)
+        self.assertEqual(self.search("uji"), [])
+
+    def test_paginated_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/teas/search/", {"name": "gyokuro", "page_size": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.gyokuro.pk])
+        response = client.get(response.data["next"])
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.sencha.pk])
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = TeaCategory.objects.create(name="Czarne")
+        cls.tea = Tea.objects.create(
+            name="Assam",
+            category=cls.category,
+            tea_type="black",
+            caffeine_level="high",
+            price=Decimal("12.00"),
+        )
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.get("/api/teas/")
+
+    def test_cached_response_skips_catalog_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/teas/")
+        self.assertEqual(response.data[0]["name"], "Assam")
+        self.assertFalse([q for q in queries.captured_queries if "teastore_tea" in q["sql"]])
+
+    def test_etag_revalidation(self):
+        etag = self.client.get("/api/teas/")["ETag"]
+        response = self.client.get("/api/teas/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get("/api/teas/")["Last-Modified"]
+        response = self.client.get("/api/teas/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_save_invalidates_after_commit(self):
+        etag = self.client.get("/api/teas/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.tea.name = "Assam Second Flush"
+            self.tea.save()
+            # Przed zatwierdzeniem wersja katalogu sie nie zmienia
+            self.assertEqual(self.client.get("/api/teas/")["ETag"], etag)
+        self.assertTrue(callbacks)
+
+        response = self.client.get("/api/teas/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data[0]["name"], "Assam Second Flush")
+
+    def test_category_rename_invalidates_category_detail(self):
+        self.client.get(f"/api/categories/{self.category.pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Czarne indyjskie"
+            self.category.save()
+        self.assertEqual(
+            self.client.get(f"/api/categories/{self.category.pk}/").data["name"],
+            "Czarne indyjskie",
+        )
+
+
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Czarne")
+        cls.assam, cls.ceylon, cls.retired = [
+            Tea.objects.create(
+                name=name,
+                category=category,
+                tea_type="black",
+                caffeine_level="high",
+                price=price,
+                stock_qty=10,
+                is_active=active,
+            )
+            for name, price, active in (
+                ("Assam", Decimal("12.50"), True),
+                ("Ceylon", Decimal("8.00"), True),
+                ("Darjeeling", Decimal("30.00"), False),
+            )
+        ]
+        cls.user = User.objects.create_user("klient", password="x")
+        cls.user.groups.add(ensure_user_group())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, items, **extra):
+        return self.client.post("/api/orders/checkout/", dict(extra, items=items), format="json")
+
+    def assertNothingOrdered(self):
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Tea.objects.get(pk=self.assam.pk).stock_qty, 10)
+
+    def test_successful_checkout(self):
+        response = self.checkout(
+            [{"tea": self.assam.pk, "quantity": 2}, {"tea": self.ceylon.pk, "quantity": 1}],
+            note="Prosze szybko",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total_amount"], "33.00")
+        self.assertEqual(response.data["item_count"], 2)
+        self.assertEqual(len(response.data["items"]), 2)
+        order = Order.objects.get()
+        self.assertEqual((order.user, order.note), (self.user, "Prosze szybko"))
+        self.assertEqual(Tea.objects.get(pk=self.assam.pk).stock_qty, 8)
+        self.assertEqual(
+            OrderItem.objects.get(order=order, tea=self.assam).unit_price, Decimal("12.50")
+        )
+
+    def test_missing_tea_is_rejected(self):
+        response = self.checkout(
+            [{"tea": self.assam.pk, "quantity": 1}, {"tea": 999, "quantity": 1}]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("999", response.data["items"][0])
+        self.assertNothingOrdered()
+
+    def test_inactive_tea_is_rejected(self):
+        response = self.checkout([{"tea": self.retired.pk, "quantity": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertNothingOrdered()
+
+    def test_duplicate_tea_is_rejected(self):
+        response = self.checkout(
+            [{"tea": self.assam.pk, "quantity": 1}, {"tea": self.assam.pk, "quantity": 2}]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNothingOrdered()
+
+    def test_insufficient_stock_rolls_back(self):
+        response = self.checkout(
+            [{"tea": self.assam.pk, "quantity": 1}, {"tea": self.ceylon.pk, "quantity": 11}]
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["shortfalls"][0]["available"], 10)
+        self.assertNothingOrdered()
+
+
+class StockTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Zielone")
+        cls.sencha = Tea.objects.create(
+            name="Sencha",
+            category=category,
+            tea_type="green",
+            caffeine_level="medium",
+            price=Decimal("20.00"),
+            stock_qty=10,
+        )
+        cls.staff = User.objects.create_user("magazyn", password="x", is_staff=True)
+        cls.staff.user_permissions.set(
+            Permission.objects.filter(content_type__app_label="teastore")
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def stock(self):
+        return Tea.objects.get(pk=self.sencha.pk).stock_qty
+
+    def order_with(self, quantity, order_status=OrderStatus.NEW):
+        order = Order.objects.create(user=self.staff, status=order_status)
+        OrderItem.objects.create(
+            order=order, tea=self.sencha, quantity=quantity, unit_price=self.sencha.price
+        )
+        return order
+
+    def set_status(self, order, order_status):
+        return self.client.put(
+            f"/api/orders/{order.pk}/",
+            {"user": self.staff.pk, "status": order_status},
+            format="json",
+        )
+
+    def test_item_reserves_and_releases_stock(self):
+        order = Order.objects.create(user=self.staff)
+        response = self.client.post(
+            "/api/order-items/",
+            {"order": order.pk, "tea": self.sencha.pk, "quantity": 4, "unit_price": "20.00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(), 6)
+        self.client.delete(f"/api/order-items/{response.data['id']}/")
+        self.assertEqual(self.stock(), 10)
+
+    def test_item_over_stock_is_rejected(self):
+        order = Order.objects.create(user=self.staff)
+        response = self.client.post(
+            "/api/order-items/",
+            {"order": order.pk, "tea": self.sencha.pk, "quantity": 11, "unit_price": "20.00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.stock(), 10)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_cancel_releases_and_restore_reserves_again(self):
+        order = self.order_with(3)
+        Tea.objects.filter(pk=self.sencha.pk).update(stock_qty=7)
+        self.assertEqual(self.set_status(order, OrderStatus.CANCELED).status_code, 200)
+        self.assertEqual(self.stock(), 10)
+        self.assertEqual(self.set_status(order, OrderStatus.PAID).status_code, 200)
+        self.assertEqual(self.stock(), 7)
+
+    def test_restore_without_stock_is_rejected(self):
+        order = self.order_with(3, OrderStatus.CANCELED)
+        Tea.objects.filter(pk=self.sencha.pk).update(stock_qty=2)
+        self.assertEqual(self.set_status(order, OrderStatus.NEW).status_code, 409)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, OrderStatus.CANCELED)
+        self.assertEqual(self.stock(), 2)
+
+    def test_shipped_order_does_not_restock(self):
+        shipped = self.order_with(3, OrderStatus.SHIPPED)
+        self.assertEqual(self.set_status(shipped, OrderStatus.CANCELED).status_code, 200)
+        self.assertEqual(self.client.delete(f"/api/orders/{shipped.pk}/").status_code, 204)
+        item = self.order_with(2, OrderStatus.SHIPPED).items.get()
+        self.client.delete(f"/api/order-items/{item.pk}/")
+        self.assertEqual(self.stock(), 10)
+
+    def test_admin_status_change_moves_stock(self):
+        order = self.order_with(3)
+        Tea.objects.filter(pk=self.sencha.pk).update(stock_qty=7)
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        url = f"/admin/teastore/order/{order.pk}/change/"
+        data = {"user": self.staff.pk, "status": OrderStatus.CANCELED, "note": ""}
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(self.stock(), 10)
+
+        Tea.objects.filter(pk=self.sencha.pk).update(stock_qty=1)
+        response = self.client.post(url, dict(data, status=OrderStatus.NEW))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, OrderStatus.CANCELED)
+        self.assertEqual(self.stock(), 1)
+
+    def test_admin_bulk_delete_releases_unshipped_orders(self):
+        orders = [self.order_with(2), self.order_with(3, OrderStatus.SHIPPED)]
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        response = self.client.post(
+            "/admin/teastore/order/",
+            {
+                "action": "delete_selected",
+                "_selected_action": [order.pk for order in orders],
+                "post": "yes",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.stock(), 12)
+
+
+class ConcurrentStockTests(TransactionTestCase):
+    def test_parallel_reservations_do_not_oversell(self):
+        category = TeaCategory.objects.create(name="Biale")
+        tea = Tea.objects.create(
+            name="Pai Mu Tan",
+            category=category,
+            tea_type="white",
+            caffeine_level="low",
+            price=Decimal("40.00"),
+            stock_qty=5,
+        )
+        barrier = threading.Barrier(8)
+        results = []
+
+        def buyer():
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        reserve_stock([(tea.pk, 1)])
+                        results.append("ok")
+                        return
+                    except InsufficientStock:
+                        results.append("short")
+                        return
+                    except OperationalError:
+                        # Wspoldzielona baza testowa w pamieci zglasza blokade zamiast czekac
+                        time.sleep(0.01)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), ["ok"] * 5 + ["short"] * 3)
+        self.assertEqual(Tea.objects.get(pk=tea.pk).stock_qty, 0)
+
+
+class OrderTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Oolong")
+        cls.teas = [
+            Tea.objects.create(
+                name=name,
+                category=category,
+                tea_type="oolong",
+                caffeine_level="medium",
+                price=Decimal("15.00"),
+            )
+            for name in ("Tie Guan Yin", "Da Hong Pao", "Dong Ding")
+        ]
+        cls.user = User.objects.create_user("sumy", password="x")
+
+    def setUp(self):
+        self.first, self.second = [Order.objects.create(user=self.user) for _ in range(2)]
+
+    def add_item(self, order, quantity, unit_price="15.00"):
+        # Kazda pozycja zamowienia z inna herbata (unikalna para zamowienie-herbata)
+        return OrderItem.objects.create(
+            order=order,
+            tea=self.teas[order.items.count()],
+            quantity=quantity,
+            unit_price=Decimal(unit_price),
+        )
+
+    def assertTotals(self, order, total_amount, item_count):
+        order.refresh_from_db()
+        self.assertEqual(
+            (order.total_amount, order.item_count), (Decimal(total_amount), item_count)
+        )
+
+    def test_create_and_update(self):
+        self.add_item(self.first, 2)
+        item = self.add_item(self.first, 1, "4.50")
+        self.assertTotals(self.first, "34.50", 2)
+
+        item = OrderItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        item.save()
+        item.save()
+        self.assertTotals(self.first, "43.50", 2)
+
+    def test_move_item_between_orders(self):
+        item = self.add_item(self.first, 2)
+        item.order = self.second
+        item.save()
+        self.assertTotals(self.first, "0.00", 0)
+        self.assertTotals(self.second, "30.00", 1)
+
+    def test_item_without_loaded_line_rebuilds_totals(self):
+        item = self.add_item(self.first, 2)
+        OrderItem(
+            pk=item.pk, order=self.first, tea=item.tea, quantity=5, unit_price=Decimal("15.00")
+        ).save()
+        self.assertTotals(self.first, "75.00", 1)
+
+    def test_deletes(self):
+        kept = self.add_item(self.first, 1)
+        removed = self.add_item(self.first, 2)
+        OrderItem.objects.get(pk=removed.pk).delete()
+        self.assertTotals(self.first, "15.00", 1)
+
+        self.add_item(self.second, 1)
+        self.add_item(self.second, 4)
+        OrderItem.objects.filter(Q(pk=kept.pk) | Q(order=self.second)).delete()
+        self.assertTotals(self.first, "0.00", 0)
+        self.assertTotals(self.second, "0.00", 0)
+
+    def test_cascade_delete_skips_per_item_updates(self):
+        for quantity in (1, 2, 3):
+            self.add_item(self.first, quantity)
+        with CaptureQueriesContext(connection) as queries:
+            self.first.delete()
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith('UPDATE "teastore_order"')]
+        )
+
+    def test_rebuild_order_totals(self):
+        self.add_item(self.first, 2)
+        self.add_item(self.second, 1, "7.25")
+        Order.objects.update(total_amount=0, item_count=99)
+        self.assertEqual(rebuild_order_totals(), 2)
+        self.assertTotals(self.first, "30.00", 1)
+        self.assertTotals(self.second, "7.25", 1)
+        empty = Order.objects.create(user=self.user, item_count=5)
+        rebuild_order_totals(Order.objects.filter(pk=empty.pk))
+        self.assertTotals(empty, "0.00", 0)
+
+
+class StreamingResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Puer")
+        teas = [
+            Tea.objects.create(
+                name=f"Puer {number}",
+                category=category,
+                tea_type="puerh",
+                caffeine_level="medium",
+                price=Decimal("25.00"),
+            )
+            for number in range(2)
+        ]
+        cls.admin = User.objects.create_superuser("strumien", password="x")
+        for number in range(5):
+            order = Order.objects.create(user=cls.admin, note=f"Zolw {number} - herbata")
+            for tea in teas[: number % 2 + 1]:
+                OrderItem.objects.create(
+                    order=order, tea=tea, quantity=number + 1, unit_price=tea.price
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertStreamMatches(self, path, **params):
+        plain = self.client.get(path, params)
+        streamed = self.client.get(path, dict(params, stream="1"))
+        self.assertTrue(streamed.streaming)
+        self.assertFalse(streamed.is_async)
+        self.assertEqual(streamed["Content-Type"], "application/json")
+        by_id = sorted(plain.json(), key=lambda row: row["id"])
+        self.assertEqual(json.loads(b"".join(streamed.streaming_content)), by_id)
+
+    def test_orders_stream_matches_json(self):
+        self.assertStreamMatches("/api/orders/")
+        self.assertStreamMatches("/api/orders/", fields="id,status,items")
+
+    def test_order_items_stream_matches_json(self):
+        self.assertStreamMatches("/api/order-items/")
+
+    async def test_asgi_stream_is_async(self):
+        await self.async_client.aforce_login(self.admin)
+        plain = await self.async_client.get("/api/orders/")
+        streamed = await self.async_client.get("/api/orders/", {"stream": "1"})
+        # Synchroniczny iterator Django pod ASGI wczytalby w calosci do pamieci
+        self.assertTrue(streamed.is_async)
+        content = b"".join([chunk async for chunk in streamed.streaming_content])
+        by_id = sorted(plain.json(), key=lambda row: row["id"])
+        self.assertEqual(json.loads(content), by_id)
+
+    def test_chunks_join_into_renderer_output(self):
+        orders = Order.objects.prefetch_related("items").order_by("pk")
+        streamed = "".join(iter_json_array(orders, OrderSerializer, chunk_size=2))
+        rendered = JSONRenderer().render(OrderSerializer(orders, many=True).data).decode()
+        self.assertEqual(streamed, rendered)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Ziolowe")
+        Tea.objects.create(
+            name="Rooibos",
+            category=category,
+            tea_type="herbal",
+            caffeine_level="none",
+            price=Decimal("9.00"),
+        )
+        cls.admin = User.objects.create_superuser("metryki", password="x")
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def view_metrics(self, view):
+        return registry._views[view]
+
+    def test_json_view_counts_sql_and_serialization(self):
+        self.client.get("/api/teas/")
+        self.client.get("/api/teas/")
+        metrics = self.view_metrics("teastore.views.tea_list")
+        self.assertEqual(metrics.requests, 2)
+        self.assertGreater(metrics.sql_queries, 0)
+        self.assertGreater(metrics.render_seconds, 0)
+        self.assertEqual(sum(metrics.latency_buckets), 2)
+
+    async def test_async_view_counts_sql(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get("/api/async/teas/")
+        self.assertEqual(response.status_code, 200)
+        # Zapytania ida w watku sync_to_async, nie w watku middleware
+        self.assertGreater(self.view_metrics("tea-list-async").sql_queries, 0)
+
+    def test_render_view_counts_template_time(self):
+        self.assertEqual(self.client.get("/api/html/teas/").status_code, 200)
+        self.assertGreater(self.view_metrics("tea-list-html").render_seconds, 0)
+
+    def test_nested_render_is_counted_once(self):
+        timer, token = track_render()
+        try:
+            with mock.patch("teastore.metrics.time.perf_counter", side_effect=[1.0, 4.0]):
+                with render_timer():
+                    with render_timer():
+                        pass
+        finally:
+            stop_tracking_render(token)
+        self.assertEqual(timer.seconds, 3.0)
+
+    def test_prometheus_output(self):
+        registry.observe('widok "a"', 0.02, 3, 0.004, 0.001)
+        registry.observe('widok "a"', 20.0, 1, 0.5, 0.25)
+        lines = self.client.get("/api/metrics/").content.decode().splitlines()
+        label = 'view="widok \\"a\\""'
+        for expected in (
+            "# TYPE teastore_requests_total counter",
+            f"teastore_requests_total{{{label}}} 2",
+            "# TYPE teastore_request_duration_seconds histogram",
+            f'teastore_request_duration_seconds_bucket{{{label},le="0.01"}} 0',
+            f'teastore_request_duration_seconds_bucket{{{label},le="0.025"}} 1',
+            f'teastore_request_duration_seconds_bucket{{{label},le="10.0"}} 1',
+            f'teastore_request_duration_seconds_bucket{{{label},le="+Inf"}} 2',
+            f"teastore_request_duration_seconds_sum{{{label}}} 20.020000",
+            f"teastore_request_duration_seconds_count{{{label}}} 2",
+            f"teastore_sql_queries_total{{{label}}} 4",
+            f"teastore_sql_duration_seconds_total{{{label}}} 0.504000",
+            f"teastore_render_duration_seconds_total{{{label}}} 0.251000",
+        ):
+            self.assertIn(expected, lines)
+
+    def test_metrics_require_staff(self):
+        self.client.force_login(User.objects.create_user("gosc", password="x"))
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+
+
+class CatalogImportTests(TestCase):
+    HEADER = (
+        "name,category,tea_type,caffeine_level,price,stock_qty,"
+        "origin_country_code,origin_region,origin_farm_name\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.black = TeaCategory.objects.create(name="Czarne")
+        cls.assam = Tea.objects.create(
+            name="Assam",
+            category=cls.black,
+            tea_type="black",
+            caffeine_level="high",
+            price=Decimal("12.00"),
+        )
+        cls.admin = User.objects.create_superuser("importer", password="x")
+
+    def record(self, name, price="5.00", category="Czarne"):
+        return {
+            "name": name,
+            "category": category,
+            "tea_type": "black",
+            "caffeine_level": "high",
+            "price": price,
+        }
+
+    def upload(self, content, name="katalog.csv"):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile(name, content.encode())
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post("/api/teas/import/", {"file": upload}, format="multipart")
+
+    def test_csv_upsert_in_batches(self):
+        rows = "".join(
+            f"Herbata {number},Zielone,green,medium,{number}.50,{number},JP,Shizuoka,\n"
+            for number in range(1, 6)
+        )
+        rows += "Assam,Czarne,black,high,14.00,7,,,\n"
+        response = self.upload(self.HEADER + rows)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in ("created", "updated", "invalid")},
+            {"created": 5, "updated": 1, "invalid": 0},
+        )
+        created = (response.data["categories_created"], response.data["origins_created"])
+        self.assertEqual(created, (1, 1))
+        assam = Tea.objects.get(pk=self.assam.pk)
+        self.assertEqual((assam.price, assam.stock_qty), (Decimal("14.00"), 7))
+        self.assertEqual(Tea.objects.get(name="Herbata 3").origin.region, "Shizuoka")
+
+    def test_queries_do_not_grow_with_rows(self):
+        def import_rows(count, prefix):
+            records = [(line, self.record(f"{prefix} {line}")) for line in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                report = CatalogImporter(batch_size=1000).run(records)
+            self.assertEqual(report["created"], count)
+            return len(queries)
+
+        self.assertEqual(import_rows(5, "Mala"), import_rows(50, "Duza"))
+
+    def test_batches_and_last_row_wins(self):
+        rows = [
+            ("Keemun", "10.00"),
+            ("Keemun", "11.00"),
+            ("Lapsang", "9.00"),
+            ("Keemun", "12.00"),
+            ("Assam", "8.00"),
+        ]
+        records = [(line, self.record(*row)) for line, row in enumerate(rows, start=1)]
+        report = CatalogImporter(batch_size=2).run(records)
+        # Paczki [Keemun, Lapsang], [Keemun, Assam] - drugi Keemun to juz aktualizacja
+        self.assertEqual((report["created"], report["updated"]), (2, 2))
+        self.assertEqual(Tea.objects.get(name="Keemun").price, Decimal("12.00"))
+        self.assertEqual(Tea.objects.get(pk=self.assam.pk).price, Decimal("8.00"))
+        self.assertEqual(Tea.objects.filter(name="Keemun").count(), 1)
+
+    def test_invalid_rows_are_reported(self):
+        content = self.HEADER + (
+            "Sencha,Zielone,green,medium,5.00,1,,,\n"
+            "sencha mala,Zielone,green,medium,5.00,1,,,\n"
+            "Gyokuro,Zielone,purple,medium,-1,1,,,\n"
+            "Bancha,Zielone,green,medium,5.00,1,pl,Mazowsze,\n"
+        )
+        response = self.upload(content)
+        self.assertEqual((response.data["created"], response.data["invalid"]), (1, 3))
+        errors = {error["line"]: error["errors"] for error in response.data["errors"]}
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertIn("name", errors[3])
+        self.assertIn("tea_type", errors[4])
+        self.assertIn("origin_country_code", errors[5])
+        self.assertFalse(Tea.objects.filter(name="Gyokuro").exists())
+
+    def test_ndjson_and_reported_errors_cap(self):
+        lines = ["nie json", json.dumps([1, 2])] * 60
+        lines.append(json.dumps(self.record("Rooibos", price=6)))
+        response = self.upload("\n".join(lines) + "\n", name="katalog.ndjson")
+        self.assertEqual((response.data["created"], response.data["invalid"]), (1, 120))
+        self.assertEqual(len(response.data["errors"]), MAX_REPORTED_ERRORS)
+        self.assertEqual(response.data["errors"][0]["line"], 1)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.upload("cokolwiek", name="katalog.xlsx")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("file_format", response.data)
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = TeaCategory.objects.create(name="Czarne")
+        cls.teas = [
+            Tea.objects.create(
+                name=name,
+                category=category,
+                tea_type="black",
+                caffeine_level="high",
+                price=Decimal("4.10"),
+            )
+            for name in ("Assam", "Earl Grey, Lady")
+        ]
+        cls.admin = User.objects.create_superuser("eksport", password="x")
+        cls.orders = []
+        for day, order_status, lines in (
+            (1, OrderStatus.NEW, [(0, 3)]),
+            (2, OrderStatus.PAID, [(0, 1), (1, 2)]),
+            (3, OrderStatus.SHIPPED, []),
+        ):
+            order = Order.objects.create(user=cls.admin, status=order_status)
+            Order.objects.filter(pk=order.pk).update(
+                created_at=datetime.datetime(2026, 3, day, 23, 30, tzinfo=datetime.timezone.utc)
+            )
+            for tea, quantity in lines:
+                OrderItem.objects.create(
+                    order=order, tea=cls.teas[tea], quantity=quantity, unit_price=Decimal("4.10")
+                )
+            cls.orders.append(order)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get("/api/orders/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode(), response
+
+    def test_csv_output(self):
+        content, response = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertRegex(response["Content-Disposition"], r'attachment; filename="orders-.+\.csv"')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], [name for name, _ in EXPORT_COLUMNS])
+        # Jeden wiersz na pozycje, zamowienie bez pozycji z pustymi kolumnami pozycji
+        self.assertEqual(len(rows), 5)
+        second = rows[3]
+        self.assertEqual(
+            second[:3], [str(self.orders[1].pk), "paid", "2026-03-02T23:30:00+00:00"]
+        )
+        self.assertEqual(second[8:], ["Earl Grey, Lady", "2", "4.10", "8.20"])
+        self.assertEqual(rows[4][1:2] + rows[4][6:], ["shipped", "", "", "", "", "", ""])
+
+    def test_ndjson_output(self):
+        content, response = self.export(output="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]["order_id"], self.orders[0].pk)
+        self.assertEqual((rows[0]["quantity"], rows[0]["line_total"]), (3, "12.30"))
+        self.assertIsNone(rows[3]["item_id"])
+
+    def test_status_and_date_filters(self):
+        def exported_orders(**params):
+            content, _ = self.export(output="ndjson", **params)
+            return sorted({json.loads(line)["order_id"] for line in content.splitlines()})
+
+        first, second, third = [order.pk for order in self.orders]
+        self.assertEqual(exported_orders(status="new,shipped"), [first, third])
+        # created_to obejmuje caly dzien, mimo ze zamowienie jest z 23:30
+        self.assertEqual(
+            exported_orders(created_from="2026-03-02", created_to="2026-03-02"), [second]
+        )
+        self.assertEqual(exported_orders(created_to="2026-03-02", status="paid"), [second])
+
+    def test_invalid_parameters(self):
+        for params, field in (
+            ({"output": "xlsx"}, "output"),
+            ({"status": "lost"}, "status"),
+            ({"created_from": "2026-3-1"}, "created_from"),
+            ({"created_to": "2026-02-30"}, "created_to"),
+        ):
+            response = self.client.get("/api/orders/export/", params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.data)
+
+    async def test_asgi_export_is_async(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get("/api/orders/export/", {"output": "ndjson"})
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 4)
+
+    def test_chunks_do_not_change_rows(self):
+        whole = list(iter_export_rows({}))
+        self.assertEqual(list(iter_export_rows({}, chunk_size=1)), whole)
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(User.objects.create_user("klient", password="x"))
+        self.assertEqual(self.client.get("/api/orders/export/").status_code, 403)
+
+
+class TeaFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.black = TeaCategory.objects.create(name="Czarne")
+        cls.green = TeaCategory.objects.create(name="Zielone")
+        organic = Origin.objects.create(country_code="JP", region="Uji", is_organic=True)
+        cls.teas = {
+            name: Tea.objects.create(
+                name=name,
+                category=category,
+                tea_type=tea_type,
+                caffeine_level=caffeine,
+                price=Decimal(price),
+                is_active=active,
+                origin=organic if tea_type == "green" else None,
+            )
+            for name, category, tea_type, caffeine, price, active in (
+                ("Assam", cls.black, "black", "high", "12.00", True),
+                ("Ceylon", cls.black, "black", "medium", "8.00", True),
+                ("Sencha", cls.green, "green", "medium", "20.00", True),
+                ("Matcha", cls.green, "green", "high", "45.00", False),
+            )
+        }
+        cls.user = User.objects.create_superuser("filtry", password="x")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def names(self, **params):
+        response = self.client.get("/api/teas/", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(tea["name"] for tea in response.data)
+
+    def test_filters(self):
+        self.assertEqual(self.names(tea_type="green"), ["Matcha", "Sencha"])
+        self.assertEqual(self.names(caffeine_level="high,medium", is_active="false"), ["Matcha"])
+        self.assertEqual(self.names(category=f"{self.black.pk}", price_min="10"), ["Assam"])
+        self.assertEqual(
+            self.names(price_min="8.00", price_max="20.00"), ["Assam", "Ceylon", "Sencha"]
+        )
+        self.assertEqual(self.names(organic="true", is_active="1"), ["Sencha"])
+        self.assertEqual(len(self.names(tea_type="")), 4)
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(
+            "/api/teas/",
+            {"tea_type": "black,blue", "price_min": "-1", "category": "0", "is_active": "moze"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            sorted(response.data), ["category", "is_active", "price_min", "tea_type"]
+        )
+
+    def test_facets_count_filtered_teas(self):
+        response = self.client.get("/api/teas/", {"is_active": "true", "facets": "1"})
+        self.assertEqual(len(response.data["results"]), 3)
+        facets = response.data["facets"]
+        self.assertEqual(
+            facets["tea_type"],
+            [
+                {"value": "black", "label": "Czarna", "count": 2},
+                {"value": "green", "label": "Zielona", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            [(row["value"], row["count"]) for row in facets["caffeine_level"]],
+            [("medium", 2), ("high", 1)],
+        )
+        self.assertEqual(
+            facets["category"],
+            [
+                {"value": self.black.pk, "label": "Czarne", "count": 2},
+                {"value": self.green.pk, "label": "Zielone", "count": 1},
+            ],
+        )
+
+    def test_facets_with_pagination(self):
+        response = self.client.get("/api/teas/", {"facets": "true", "page_size": "2"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(sum(row["count"] for row in response.data["facets"]["tea_type"]), 4)
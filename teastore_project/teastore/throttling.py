@@ -0,0 +1,78 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Blokada kubelka: czas zycia (s) na wypadek przerwanego procesu i proby jej przejecia
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_DELAY = 0.005
+
+# scope -> (pojemnosc kubelka, tokeny odzyskiwane na minute)
+AUTH_THROTTLE_RATES = getattr(
+    settings, "TEASTORE_AUTH_THROTTLE_RATES", {"ip": (20, 10), "username": (5, 1)}
+)
+
+
+class TokenBucket:
+    def __init__(self, scope, capacity, per_minute):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = per_minute / 60
+        # Po tym czasie kubelek i tak bylby pelny, wiec wpis moze wygasnac
+        self.timeout = int(capacity / self.rate) + 1
+
+    def _key(self, ident):
+        return f"teastore:throttle:{self.scope}:{hashlib.sha256(ident.encode()).hexdigest()}"
+
+    def take(self, ident):
+        # Zwraca 0, gdy pobrano token, albo liczbe sekund do odzyskania najblizszego.
+        # Odczyt i zapis kubelka pod blokada z cache.add (atomowe w kazdym backendzie) -
+        # inaczej rownolegle zadania czytalyby ten sam stan i wszystkie dostalyby token
+        key = self._key(ident)
+        lock = f"{key}:lock"
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock, 1, LOCK_TIMEOUT):
+                try:
+                    return self._take(key)
+                finally:
+                    cache.delete(lock)
+            time.sleep(LOCK_RETRY_DELAY)
+        # Kubelek stale zajety przez inne zadania - traktujemy to jak brak tokenu
+        return LOCK_TIMEOUT
+
+    def _take(self, key):
+        now = time.time()
+        tokens, updated = cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        cache.set(key, (tokens - 1, now), self.timeout)
+        return 0
+
+
+AUTH_BUCKETS = {
+    scope: TokenBucket(f"auth-{scope}", *rate) for scope, rate in AUTH_THROTTLE_RATES.items()
+}
+
+
+def auth_throttle_wait(request, username=None):
+    # Sprawdzane przed authenticate()/set_password, zeby odrzucone proby nie liczyly PBKDF2
+    idents = {"ip": BaseThrottle().get_ident(request) or ""}
+    if username:
+        idents["username"] = str(username).strip().lower()
+    return max(AUTH_BUCKETS[scope].take(ident) for scope, ident in idents.items())
+
+
+class AuthRateThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        if request.method != "POST":
+            return True
+        data = request.data if isinstance(request.data, dict) else {}
+        self.retry_after = auth_throttle_wait(request, data.get("username"))
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Order, OrderItem
+
+
+def adjust_order_totals(order_id, amount, count):
+    if not amount and not count:
+        return
+    Order.objects.filter(pk=order_id).update(
+        total_amount=F("total_amount") + amount,
+        item_count=F("item_count") + count,
+    )
+
+
+def order_totals_expressions():
+    items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    line_total = ExpressionWrapper(
+        F("unit_price") * F("quantity"), output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    return {
+        "total_amount": Coalesce(
+            Subquery(items.annotate(total=Sum(line_total)).values("total")),
+            Value(Decimal("0")),
+            output_field=Order._meta.get_field("total_amount"),
+        ),
+        "item_count": Coalesce(Subquery(items.annotate(count=Count("pk")).values("count")), 0),
+    }
+
+
+def rebuild_order_totals(queryset=None):
+    # Jedno zapytanie UPDATE z podzapytaniami agregujacymi dla wszystkich zamowien
+    queryset = Order.objects.all() if queryset is None else queryset
+    return queryset.update(**order_totals_expressions())
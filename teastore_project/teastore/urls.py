@@ -1,20 +1,33 @@
 from django.urls import path
 
+from .async_views import (
+    tea_list_async,
+    tea_detail_async,
+    teas_search_async,
+    orders_my_async,
+    category_detail_async,
+    origin_detail_async,
+)
 from .views import (
     register_user,
+    register_users_bulk,
     user_login,
     user_logout,
     teas_search,
     orders_my,
+    metrics,
     tea_list,
     tea_detail,
     tea_update_delete,
+    tea_import,
     category_list,
     category_detail,
     origin_list,
     origin_detail,
     order_list,
     order_detail,
+    order_checkout,
+    order_export,
     order_item_list,
     order_item_detail,
     tea_list_html,
@@ -36,21 +49,32 @@ from .views import (
 
 urlpatterns = [
     path("auth/register/", register_user, name="register-user"),
+    path("auth/register/bulk/", register_users_bulk, name="register-users-bulk"),
     path("login/", user_login, name="user-login"),
     path("logout/", user_logout, name="user-logout"),
     path("teas/", tea_list),
     path("teas/<int:pk>/", tea_detail),
     path("teas/update_delete/<int:pk>/", tea_update_delete),
+    path("teas/import/", tea_import, name="tea-import"),
     path("categories/", category_list),
     path("categories/<int:pk>/", category_detail),
     path("origins/", origin_list),
     path("origins/<int:pk>/", origin_detail),
     path("orders/", order_list),
     path("orders/<int:pk>/", order_detail),
+    path("orders/checkout/", order_checkout, name="order-checkout"),
+    path("orders/export/", order_export, name="order-export"),
     path("order-items/", order_item_list),
     path("order-items/<int:pk>/", order_item_detail),
     path("teas/search/", teas_search, name="teas-search"),
     path("orders/my/", orders_my, name="orders-my"),
+    path("metrics/", metrics, name="metrics"),
+    path("async/teas/", tea_list_async, name="tea-list-async"),
+    path("async/teas/<int:pk>/", tea_detail_async, name="tea-detail-async"),
+    path("async/teas/search/", teas_search_async, name="teas-search-async"),
+    path("async/orders/my/", orders_my_async, name="orders-my-async"),
+    path("async/categories/<int:pk>/", category_detail_async, name="category-detail-async"),
+    path("async/origins/<int:pk>/", origin_detail_async, name="origin-detail-async"),
     path("html/teas/", tea_list_html, name="tea-list-html"),
     path("html/teas/<int:id>/", tea_detail_html, name="tea-detail-html"),
     path("html/teas/dodaj/", tea_create_html, name="tea-create-html"),
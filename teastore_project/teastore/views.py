@@ -1,18 +1,53 @@
-from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
+import io
+import math
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import Http404
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.http import Http404, HttpResponse
 from django.shortcuts import redirect, render
 from rest_framework import status
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
-from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+    throttle_classes,
+)
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from .forms import TeaForm, TeaCategoryForm, OriginForm, OrderForm, OrderItemForm
+from .accounts import build_user, register_user_account, register_user_accounts_bulk
+from .authentication import CachedTokenAuthentication
+from .cache import CATALOG_CACHE_TIMEOUT, catalog_response, fragment_versions
+from .catalog_import import detect_format, import_catalog
+from .checkout import place_order
+from .export import EXPORT_FORMATS, export_filters, export_response
+from .fieldsets import (
+    project_columns,
+    sparse_fields,
+    sparse_queryset,
+    sparse_serializer,
+    wants_field,
+)
+from .filters import filter_teas, tea_facets, wants_facets
+from .forms import (
+    TeaForm,
+    TeaCategoryForm,
+    OriginForm,
+    OrderForm,
+    OrderItemForm,
+    OrderFilterForm,
+)
+from .metrics import registry as metrics_registry
 from .models import TeaCategory, Origin, Tea, Order, OrderItem, OrderStatus
+from .pagination import paginated_response, search_paginated_response, wants_pagination
+from .permissions import user_has_perm
+from .search import TeaSearchResults, search_available
 from .serializers import (
     TeaCategorySerializer,
     OriginSerializer,
@@ -20,43 +55,95 @@ from .serializers import (
     OrderSerializer,
     OrderItemSerializer,
     UserRegistrationSerializer,
+    BulkUserRegistrationSerializer,
+    CheckoutSerializer,
 )
-
-def _ensure_user_group():
-    group, _ = Group.objects.get_or_create(name="TeaStoreUser")
-    model_perms = [
-        (TeaCategory, ["view"]),
-        (Origin, ["view"]),
-        (Tea, ["view"]),
-        (Order, ["add", "view"]),
-        (OrderItem, ["add", "view"]),
-    ]
-    for model, perms in model_perms:
-        content_type = ContentType.objects.get_for_model(model)
-        for perm in perms:
-            codename = f"{perm}_{model._meta.model_name}"
-            permission = Permission.objects.get(codename=codename, content_type=content_type)
-            group.permissions.add(permission)
-    return group
+from .stock import (
+    InsufficientStock,
+    apply_status_change,
+    holds_stock,
+    order_lines,
+    release_stock,
+    reserve_stock,
+)
+from .streaming import streaming_json_response, wants_stream
+from .throttling import AuthRateThrottle, auth_throttle_wait
 
 
+# Bez uwierzytelniania: domyslne BasicAuthentication DRF sprawdzaloby haslo z naglowka
+# Authorization przed limitem prob
 @api_view(["POST"])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes([AuthRateThrottle])
 def register_user(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        group = _ensure_user_group()
-        user.groups.add(group)
-        token, _ = Token.objects.get_or_create(user=user)
+        # Haslo haszowane przed transakcja, jak w rejestracji zbiorczej
+        user = build_user(serializer.validated_data)
+        try:
+            with transaction.atomic():
+                user.save()
+                token = register_user_account(user)
+        except IntegrityError:
+            return Response(
+                {"username": ["Uzytkownik o tej nazwie juz istnieje."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         return Response({"token": token.key}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["POST"])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAdminUser])
+def register_users_bulk(request):
+    serializer = BulkUserRegistrationSerializer(data=request.data, many=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = serializer.validated_data
+    # Unikalnosc sprawdzamy po normalizacji, tak jak nazwy trafia do bazy
+    usernames = [User.normalize_username(row["username"]) for row in rows]
+    taken = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+    errors = {}
+    seen = set()
+    for index, username in enumerate(usernames):
+        if username in taken or username in seen:
+            errors[index] = {"username": ["Uzytkownik o tej nazwie juz istnieje."]}
+        seen.add(username)
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        tokens = register_user_accounts_bulk(rows)
+    except IntegrityError:
+        # Rownolegla rejestracja zajela ktoras nazwe miedzy sprawdzeniem a zapisem
+        return Response(
+            {"username": ["Uzytkownik o tej nazwie juz istnieje."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(
+        [{"username": token.user.username, "token": token.key} for token in tokens],
+        status=status.HTTP_201_CREATED,
+    )
+
+
 def user_login(request):
     if request.method == "POST":
         username = request.POST.get("username")
         password = request.POST.get("password")
+        retry_after = auth_throttle_wait(request, username)
+        if retry_after:
+            retry_after = math.ceil(retry_after)
+            response = render(
+                request,
+                "teastore/login.html",
+                {"error": f"Zbyt wiele prob logowania. Sprobuj ponownie za {retry_after} s."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            response["Retry-After"] = str(retry_after)
+            return response
         user = authenticate(request, username=username, password=password)
         if user is not None:
             login(request, user)
@@ -65,13 +152,21 @@ def user_login(request):
     return render(request, "teastore/login.html")
 
 
+class ThrottledObtainAuthToken(ObtainAuthToken):
+    authentication_classes = []
+    throttle_classes = [AuthRateThrottle]
+
+
+obtain_auth_token = ThrottledObtainAuthToken.as_view()
+
+
 def user_logout(request):
     logout(request)
     return redirect("user-login")
 
 
 def _has_view_permission(user, model):
-    return user.has_perm(f"{model._meta.app_label}.view_{model._meta.model_name}")
+    return user_has_perm(user, f"{model._meta.app_label}.view_{model._meta.model_name}")
 
 
 def _required_perm_for_method(method, model):
@@ -92,7 +187,7 @@ def _check_model_permission(request, model):
     perm = _required_perm_for_method(request.method, model)
     if not perm:
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
-    if not request.user.has_perm(perm):
+    if not user_has_perm(request.user, perm):
         return Response(
             {"detail": "Brak uprawnien do tej operacji."},
             status=status.HTTP_403_FORBIDDEN,
@@ -100,8 +195,37 @@ def _check_model_permission(request, model):
     return None
 
 
+def _detail_response(request, model, serializer_class, pk):
+    queryset, serializer_class = sparse_queryset(request, model.objects.all(), serializer_class)
+    try:
+        instance = queryset.get(pk=pk)
+    except model.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    serializer = serializer_class(instance)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+def _list_response(queryset, serializer_class):
+    serializer = serializer_class(queryset, many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+def _tea_list_response(request):
+    teas = filter_teas(Tea.objects.all(), request.query_params)
+    rows, serializer_class = sparse_queryset(request, teas, TeaSerializer)
+    if wants_pagination(request):
+        response = paginated_response(request, rows, serializer_class, ordering="id")
+    else:
+        response = _list_response(rows, serializer_class)
+    if wants_facets(request):
+        # Lista bez paginacji jest tablica, wiec przy fasetach opakowujemy ja w slownik
+        data = response.data if isinstance(response.data, dict) else {"results": response.data}
+        response.data = dict(data, facets=tea_facets(teas))
+    return response
+
+
 @api_view(["GET", "POST"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def tea_list(request):
     permission_error = _check_model_permission(request, Tea)
@@ -109,9 +233,7 @@ def tea_list(request):
         return permission_error
 
     if request.method == "GET":
-        teas = Tea.objects.all()
-        serializer = TeaSerializer(teas, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return catalog_response(request, lambda: _tea_list_response(request))
 
     serializer = TeaSerializer(data=request.data)
     if serializer.is_valid():
@@ -121,24 +243,18 @@ def tea_list(request):
 
 
 @api_view(["GET"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def tea_detail(request, pk):
     permission_error = _check_model_permission(request, Tea)
     if permission_error:
         return permission_error
 
-    try:
-        tea = Tea.objects.get(pk=pk)
-    except Tea.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
-
-    serializer = TeaSerializer(tea)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return catalog_response(request, lambda: _detail_response(request, Tea, TeaSerializer, pk))
 
 
 @api_view(["PUT", "DELETE"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def tea_update_delete(request, pk):
     permission_error = _check_model_permission(request, Tea)
@@ -161,8 +277,28 @@ def tea_update_delete(request, pk):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(["POST"])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAdminUser])
+def tea_import(request):
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response({"file": ["Plik jest wymagany."]}, status=status.HTTP_400_BAD_REQUEST)
+    file_format = request.data.get("file_format") or detect_format(upload.name)
+    if file_format not in ("csv", "ndjson"):
+        return Response(
+            {"file_format": ["Obslugiwane formaty to csv i ndjson."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Duze pliki Django trzyma na dysku, wiec czytamy je strumieniowo
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    report = import_catalog(stream, file_format)
+    return Response(report, status=status.HTTP_200_OK)
+
+
 @api_view(["GET", "POST"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def category_list(request):
     permission_error = _check_model_permission(request, TeaCategory)
@@ -170,9 +306,12 @@ def category_list(request):
         return permission_error
 
     if request.method == "GET":
-        categories = TeaCategory.objects.all()
-        serializer = TeaCategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return catalog_response(
+            request,
+            lambda: _list_response(
+                *sparse_queryset(request, TeaCategory.objects.all(), TeaCategorySerializer)
+            ),
+        )
 
     serializer = TeaCategorySerializer(data=request.data)
     if serializer.is_valid():
@@ -182,22 +321,23 @@ def category_list(request):
 
 
 @api_view(["GET", "PUT", "DELETE"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def category_detail(request, pk):
     permission_error = _check_model_permission(request, TeaCategory)
     if permission_error:
         return permission_error
 
+    if request.method == "GET":
+        return catalog_response(
+            request, lambda: _detail_response(request, TeaCategory, TeaCategorySerializer, pk)
+        )
+
     try:
         category = TeaCategory.objects.get(pk=pk)
     except TeaCategory.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == "GET":
-        serializer = TeaCategorySerializer(category)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
     if request.method == "PUT":
         serializer = TeaCategorySerializer(category, data=request.data)
         if serializer.is_valid():
@@ -210,7 +350,7 @@ def category_detail(request, pk):
 
 
 @api_view(["GET", "POST"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def origin_list(request):
     permission_error = _check_model_permission(request, Origin)
@@ -218,9 +358,12 @@ def origin_list(request):
         return permission_error
 
     if request.method == "GET":
-        origins = Origin.objects.all()
-        serializer = OriginSerializer(origins, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return catalog_response(
+            request,
+            lambda: _list_response(
+                *sparse_queryset(request, Origin.objects.all(), OriginSerializer)
+            ),
+        )
 
     serializer = OriginSerializer(data=request.data)
     if serializer.is_valid():
@@ -230,22 +373,23 @@ def origin_list(request):
 
 
 @api_view(["GET", "PUT", "DELETE"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def origin_detail(request, pk):
     permission_error = _check_model_permission(request, Origin)
     if permission_error:
         return permission_error
 
+    if request.method == "GET":
+        return catalog_response(
+            request, lambda: _detail_response(request, Origin, OriginSerializer, pk)
+        )
+
     try:
         origin = Origin.objects.get(pk=pk)
     except Origin.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == "GET":
-        serializer = OriginSerializer(origin)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
     if request.method == "PUT":
         serializer = OriginSerializer(origin, data=request.data)
         if serializer.is_valid():
@@ -258,7 +402,7 @@ def origin_detail(request, pk):
 
 
 @api_view(["GET", "POST"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def order_list(request):
     permission_error = _check_model_permission(request, Order)
@@ -270,7 +414,19 @@ def order_list(request):
             orders = Order.objects.all()
         else:
             orders = Order.objects.filter(user=request.user)
-        serializer = OrderSerializer(orders, many=True)
+        fields = sparse_fields(request, OrderSerializer)
+        # created_at jest kluczem kursora paginacji
+        orders = project_columns(orders, fields, keep=("created_at",))
+        if wants_field(fields, "items"):
+            orders = orders.prefetch_related("items")
+        serializer_class = sparse_serializer(OrderSerializer, fields)
+        if wants_stream(request):
+            return streaming_json_response(request, orders, serializer_class)
+        if wants_pagination(request):
+            return paginated_response(
+                request, orders, serializer_class, ordering=("-created_at", "-id")
+            )
+        serializer = serializer_class(orders, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     serializer = OrderSerializer(data=request.data)
@@ -280,23 +436,65 @@ def order_list(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["GET"])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAdminUser])
+def order_export(request):
+    # "format" zajmuje DRF (wybor renderera), stad osobny parametr
+    output_format = request.query_params.get("output", "csv")
+    if output_format not in EXPORT_FORMATS:
+        return Response(
+            {"output": ["Obslugiwane formaty to csv i ndjson."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return export_response(request, export_filters(request.query_params), output_format)
+
+
+@api_view(["POST"])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def order_checkout(request):
+    for model in (Order, OrderItem):
+        permission_error = _check_model_permission(request, model)
+        if permission_error:
+            return permission_error
+
+    serializer = CheckoutSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    order = place_order(
+        request.user,
+        data["items"],
+        delivery_date=data.get("delivery_date"),
+        note=data.get("note", ""),
+    )
+    order = Order.objects.prefetch_related("items").get(pk=order.pk)
+    return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+
 @api_view(["GET", "PUT", "DELETE"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def order_detail(request, pk):
     permission_error = _check_model_permission(request, Order)
     if permission_error:
         return permission_error
 
+    fields = sparse_fields(request, OrderSerializer) if request.method == "GET" else None
+    orders = project_columns(Order.objects.all(), fields, keep=("user",))
+    if wants_field(fields, "items"):
+        orders = orders.prefetch_related("items")
     try:
-        order = Order.objects.get(pk=pk)
+        order = orders.get(pk=pk)
     except Order.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
         if not (request.user.is_staff or request.user.is_superuser) and order.user != request.user:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = OrderSerializer(order)
+        serializer = sparse_serializer(OrderSerializer, fields)(order)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     if request.method == "PUT":
@@ -307,7 +505,10 @@ def order_detail(request, pk):
             )
         serializer = OrderSerializer(order, data=request.data)
         if serializer.is_valid():
-            serializer.save(user=order.user)
+            previous_status = order.status
+            with transaction.atomic():
+                serializer.save(user=order.user)
+                apply_status_change(order, previous_status)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -316,12 +517,15 @@ def order_detail(request, pk):
             {"detail": "Brak uprawnien do usuwania zamowien."},
             status=status.HTTP_403_FORBIDDEN,
         )
-    order.delete()
+    with transaction.atomic():
+        if holds_stock(order):
+            release_stock(order_lines(order))
+        order.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(["GET", "POST"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def order_item_list(request):
     permission_error = _check_model_permission(request, OrderItem)
@@ -333,7 +537,12 @@ def order_item_list(request):
             items = OrderItem.objects.all()
         else:
             items = OrderItem.objects.filter(order__user=request.user)
-        serializer = OrderItemSerializer(items, many=True)
+        items, serializer_class = sparse_queryset(request, items, OrderItemSerializer)
+        if wants_stream(request):
+            return streaming_json_response(request, items, serializer_class)
+        if wants_pagination(request):
+            return paginated_response(request, items, serializer_class, ordering="id")
+        serializer = serializer_class(items, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     serializer = OrderItemSerializer(data=request.data)
@@ -344,28 +553,33 @@ def order_item_list(request):
                 {"detail": "Nie mozna dodac pozycji do cudzego zamowienia."},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        serializer.save()
+        with transaction.atomic():
+            if holds_stock(order):
+                tea = serializer.validated_data["tea"]
+                reserve_stock([(tea.pk, serializer.validated_data["quantity"])])
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(["GET", "PUT", "DELETE"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def order_item_detail(request, pk):
     permission_error = _check_model_permission(request, OrderItem)
     if permission_error:
         return permission_error
 
+    fields = sparse_fields(request, OrderItemSerializer) if request.method == "GET" else None
     try:
-        item = OrderItem.objects.get(pk=pk)
+        item = project_columns(OrderItem.objects.all(), fields, keep=("order",)).get(pk=pk)
     except OrderItem.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
         if not (request.user.is_staff or request.user.is_superuser) and item.order.user != request.user:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = OrderItemSerializer(item)
+        serializer = sparse_serializer(OrderItemSerializer, fields)(item)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     if request.method == "PUT":
@@ -376,7 +590,14 @@ def order_item_detail(request, pk):
             )
         serializer = OrderItemSerializer(item, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                if holds_stock(item.order):
+                    release_stock([(item.tea_id, item.quantity)])
+                new_order = serializer.validated_data["order"]
+                if holds_stock(new_order):
+                    tea = serializer.validated_data["tea"]
+                    reserve_stock([(tea.pk, serializer.validated_data["quantity"])])
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -385,12 +606,15 @@ def order_item_detail(request, pk):
             {"detail": "Brak uprawnien do usuwania pozycji."},
             status=status.HTTP_403_FORBIDDEN,
         )
-    item.delete()
+    with transaction.atomic():
+        if holds_stock(item.order):
+            release_stock([(item.tea_id, item.quantity)])
+        item.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(["GET"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def teas_search(request):
     if not _has_view_permission(request.user, Tea):
@@ -400,28 +624,63 @@ def teas_search(request):
     if not name:
         return Response({"error": "Parametr 'name' jest wymagany."}, status=status.HTTP_400_BAD_REQUEST)
 
-    teas = Tea.objects.filter(name__icontains=name)
-    serializer = TeaSerializer(teas, many=True)
+    fields = sparse_fields(request, TeaSerializer)
+    if search_available():
+        teas = TeaSearchResults(name, queryset=project_columns(Tea.objects.all(), fields))
+    else:
+        teas = project_columns(Tea.objects.filter(name__icontains=name).order_by("id"), fields)
+    serializer_class = sparse_serializer(TeaSerializer, fields)
+    if "page" in request.query_params or "page_size" in request.query_params:
+        return search_paginated_response(request, teas, serializer_class)
+    serializer = serializer_class(teas, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def orders_my(request):
     if not _has_view_permission(request.user, Order):
         return Response({"detail": "Brak uprawnien do podgladu zamowien."}, status=status.HTTP_403_FORBIDDEN)
 
-    orders = Order.objects.filter(user=request.user)
-    serializer = OrderSerializer(orders, many=True)
+    fields = sparse_fields(request, OrderSerializer)
+    orders = project_columns(Order.objects.filter(user=request.user), fields)
+    if wants_field(fields, "items"):
+        orders = orders.prefetch_related("items")
+    serializer = sparse_serializer(OrderSerializer, fields)(orders, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(["GET"])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+HTML_PAGE_SIZE = getattr(settings, "TEASTORE_HTML_PAGE_SIZE", 50)
+
+
 # Proste widoki HTML w stylu z projektu wzorcowego
 @login_required(login_url="/api/login/")
 def tea_list_html(request):
-    teas = Tea.objects.all()
-    return render(request, "teastore/tea/list.html", {"teas": teas})
+    # Karty trafiaja do cache pod aktualna wersja, wiec czytamy je z bazy glownej
+    teas = Tea.objects.using(DEFAULT_DB_ALIAS).select_related("category").order_by("id")
+    page = Paginator(teas, HTML_PAGE_SIZE).get_page(request.GET.get("page"))
+    # Karta herbaty jest cachowana jako fragment szablonu - klucz zmienia sie po zapisie
+    # herbaty lub jej kategorii
+    tea_versions = fragment_versions(Tea, [tea.pk for tea in page])
+    category_versions = fragment_versions(TeaCategory, {tea.category_id for tea in page})
+    for tea in page:
+        tea.card_version = f"{tea_versions[tea.pk]}-{category_versions[tea.category_id]}"
+    return render(
+        request,
+        "teastore/tea/list.html",
+        {"page_obj": page, "card_timeout": CATALOG_CACHE_TIMEOUT},
+    )
 
 
 @login_required(login_url="/api/login/")
@@ -544,35 +803,40 @@ def origin_create_html(request):
 
 @login_required(login_url="/api/login/")
 def order_list_html(request):
-    if request.user.is_staff or request.user.is_superuser:
-        orders = Order.objects.all()
-    else:
-        orders = Order.objects.filter(user=request.user)
-    return render(request, "teastore/order/list.html", {"orders": orders})
+    orders = Order.objects.select_related("user").order_by("-created_at", "-id")
+    if not (request.user.is_staff or request.user.is_superuser):
+        orders = orders.filter(user=request.user)
+    filter_form = OrderFilterForm(request.GET)
+    page = Paginator(filter_form.filter(orders), HTML_PAGE_SIZE).get_page(request.GET.get("page"))
+    return render(
+        request, "teastore/order/list.html", {"page_obj": page, "filter_form": filter_form}
+    )
 
 
 @login_required(login_url="/api/login/")
 def order_detail_html(request, id):
     try:
-        order = Order.objects.get(id=id)
+        order = Order.objects.select_related("user").get(id=id)
     except Order.DoesNotExist:
         raise Http404("Obiekt Order o podanym id nie istnieje.")
 
     if request.method == "GET":
         if not (request.user.is_staff or request.user.is_superuser) and order.user != request.user:
             raise Http404("Brak dostepu do zamowienia.")
-        items = OrderItem.objects.filter(order=order)
-        total_price = sum((item.unit_price * item.quantity) for item in items)
+        items = order.items.select_related("tea").order_by("id")
         return render(
             request,
             "teastore/order/detail.html",
-            {"order": order, "items": items, "total_price": total_price},
+            {"order": order, "items": items, "total_price": order.total_amount},
         )
 
     if request.method == "POST":
         if not (request.user.is_staff or request.user.is_superuser):
             raise Http404("Brak uprawnien do usuwania zamowien.")
-        order.delete()
+        with transaction.atomic():
+            if holds_stock(order):
+                release_stock(order_lines(order))
+            order.delete()
         return redirect("order-list-html")
 
     return redirect("order-list-html")
@@ -601,17 +865,21 @@ def order_create_html(request):
 
 @login_required(login_url="/api/login/")
 def order_item_list_html(request):
-    if request.user.is_staff or request.user.is_superuser:
-        items = OrderItem.objects.all()
-    else:
-        items = OrderItem.objects.filter(order__user=request.user)
-    return render(request, "teastore/order_item/list.html", {"items": items})
+    items = OrderItem.objects.select_related("order", "tea").order_by("-id")
+    if not (request.user.is_staff or request.user.is_superuser):
+        items = items.filter(order__user=request.user)
+    filter_form = OrderFilterForm(request.GET)
+    items = filter_form.filter(items, prefix="order__")
+    page = Paginator(items, HTML_PAGE_SIZE).get_page(request.GET.get("page"))
+    return render(
+        request, "teastore/order_item/list.html", {"page_obj": page, "filter_form": filter_form}
+    )
 
 
 @login_required(login_url="/api/login/")
 def order_item_detail_html(request, id):
     try:
-        item = OrderItem.objects.get(id=id)
+        item = OrderItem.objects.select_related("order__user", "tea").get(id=id)
     except OrderItem.DoesNotExist:
         raise Http404("Obiekt OrderItem o podanym id nie istnieje.")
 
@@ -623,7 +891,10 @@ def order_item_detail_html(request, id):
     if request.method == "POST":
         if not (request.user.is_staff or request.user.is_superuser):
             raise Http404("Brak uprawnien do usuwania pozycji.")
-        item.delete()
+        with transaction.atomic():
+            if holds_stock(item.order):
+                release_stock([(item.tea_id, item.quantity)])
+            item.delete()
         return redirect("order-item-list-html")
 
     return redirect("order-item-list-html")
@@ -642,8 +913,19 @@ def order_item_create_html(request):
                     raise Http404("Brak dostepu do zamowienia.")
             item = form.save(commit=False)
             item.unit_price = item.tea.price
-            item.save()
-            return redirect("order-item-list-html")
+            try:
+                with transaction.atomic():
+                    if holds_stock(item.order):
+                        reserve_stock([(item.tea_id, item.quantity)])
+                    item.save()
+            except InsufficientStock as exc:
+                shortfall = exc.shortfalls[0]
+                form.add_error(
+                    "quantity",
+                    f"Niewystarczajacy stan magazynowy (dostepne: {shortfall['available']}).",
+                )
+            else:
+                return redirect("order-item-list-html")
     else:
         form = OrderItemForm()
         if not (request.user.is_staff or request.user.is_superuser):
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'teastore.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +58,7 @@ ROOT_URLCONF = 'teastore_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'teastore.template_backends.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,6 +84,72 @@ DATABASES = {
     }
 }
 
+# Profil produkcyjny SQLite (TEASTORE_DB_PROFILE=production). WAL pozwala czytac w trakcie
+# zapisu, IMMEDIATE bierze blokade zapisu na starcie transakcji (zamiast "database is locked"
+# przy podnoszeniu blokady), timeout to czas oczekiwania na blokade w sekundach. Pragmy sa
+# wykonywane raz na polaczenie, a CONN_MAX_AGE pozwala uzywac polaczen ponownie.
+TEASTORE_SQLITE_PRODUCTION = {
+    'OPTIONS': {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=268435456;'
+            'PRAGMA cache_size=-65536;'
+            'PRAGMA temp_store=MEMORY'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    },
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+}
+
+TEASTORE_DB_PROFILE = os.environ.get('TEASTORE_DB_PROFILE', 'default')
+if TEASTORE_DB_PROFILE == 'production':
+    DATABASES['default'].update(TEASTORE_SQLITE_PRODUCTION)
+
+# Replika tylko do odczytu (TEASTORE_REPLICA_NAME=sciezka/do/repliki.sqlite3): zadania GET czytaja
+# z repliki, zapisy i odczyty po zapisie ida do bazy glownej. Replike odswieza
+# "manage.py sync_replica". Wpisy cache katalogu i karty herbat sa budowane z bazy glownej.
+# W testach replika wskazuje na testowa baze glowna.
+TEASTORE_REPLICA_NAME = os.environ.get('TEASTORE_REPLICA_NAME')
+TEASTORE_REPLICA_PIN_SECONDS = 10
+if TEASTORE_REPLICA_NAME:
+    DATABASES['replica'] = dict(
+        DATABASES['default'], NAME=TEASTORE_REPLICA_NAME, TEST={'MIRROR': 'default'}
+    )
+    DATABASE_ROUTERS = ['teastore.routers.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'teastore.middleware.ReplicaRoutingMiddleware')
+
+# Sesje (TEASTORE_SESSION_PROFILE): "db" - domyslny backend Django, "cached_db" - odczyt sesji
+# z cache i zapis do bazy tylko przy zmianie, "signed_cookies" - sesja w podpisanym ciasteczku,
+# bez tabeli django_session. Wygasle sesje w bazie usuwa "manage.py cleanup_sessions".
+TEASTORE_SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+TEASTORE_SESSION_PROFILE = os.environ.get('TEASTORE_SESSION_PROFILE', 'db')
+SESSION_ENGINE = TEASTORE_SESSION_ENGINES[TEASTORE_SESSION_PROFILE]
+TEASTORE_SESSION_CLEANUP_BATCH_SIZE = 1000
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMemCache jest osobny w kazdym procesie - przy wielu workerach ustaw wspolny backend
+# (np. Redis), zeby wersje katalogu i uprawnien byly wspolne. Domyslne MAX_ENTRIES (300)
+# zapelniaja same wersje kart herbat, a przepelnienie usuwa tez klucze wersji katalogu.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'teastore',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -123,3 +191,44 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# TeaStore
+
+# Domyslny i maksymalny rozmiar strony dla paginacji kursorowej (?cursor= / ?page_size=)
+TEASTORE_PAGE_SIZE = 50
+TEASTORE_MAX_PAGE_SIZE = 500
+
+# Rozmiar strony w widokach HTML (?page=)
+TEASTORE_HTML_PAGE_SIZE = 50
+
+# Czas zycia odpowiedzi katalogu w cache (wersja katalogu i tak uniewaznia je przy zmianach)
+TEASTORE_CATALOG_CACHE_TIMEOUT = 3600
+
+# Liczba wierszy w jednej paczce przy strumieniowaniu list (?stream=1)
+TEASTORE_STREAM_CHUNK_SIZE = 2000
+
+# Cache tokenow API (CachedTokenAuthentication): liczba wpisow w pamieci procesu, czas zycia
+# w sekundach i opcjonalna druga warstwa we wspolnym cache (CACHES["default"])
+TEASTORE_TOKEN_CACHE_SIZE = 1024
+TEASTORE_TOKEN_CACHE_TIMEOUT = 60
+TEASTORE_TOKEN_SHARED_CACHE = False
+
+# Limity prob logowania i rejestracji (user_login, register_user, api-token-auth): kubelek
+# tokenow na adres IP i na nazwe uzytkownika - (pojemnosc, tokeny odzyskiwane na minute)
+TEASTORE_AUTH_THROTTLE_RATES = {
+    'ip': (20, 10),
+    'username': (5, 1),
+}
+
+# Adres klienta dla limitow (get_ident DRF): liczba zaufanych proxy przed aplikacja. 0 oznacza
+# REMOTE_ADDR - bez NUM_PROXIES DRF ufa naglowkowi X-Forwarded-For, ktory klient moze podrobic
+REST_FRAMEWORK = {
+    'NUM_PROXIES': int(os.environ.get('TEASTORE_NUM_PROXIES', 0)),
+}
+
+# Import katalogu: liczba wierszy zapisywanych w jednej transakcji
+TEASTORE_IMPORT_BATCH_SIZE = 1000
+
+# Eksport zamowien: liczba zamowien pobieranych jednym zapytaniem
+TEASTORE_EXPORT_CHUNK_SIZE = 2000
@@ -17,7 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
-from rest_framework.authtoken.views import obtain_auth_token
+
+from teastore.views import obtain_auth_token
 
 urlpatterns = [
     path("", RedirectView.as_view(url="/api/html/teas/", permanent=False)),